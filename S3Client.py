@@ -3,6 +3,8 @@ import pathlib
 import logging
 from botocore.exceptions import ClientError
 
+from mtDB.db.OutputProbe import OutputProbe, TAIL_BLOCK_SIZE_BYTE
+
 
 class S3Client:
     def __init__(self, ACCESS_KEY, SECRET_KEY):
@@ -31,6 +33,22 @@ class S3Client:
         return self.s3.list_objects_v2(Bucket=self.bucket_name, Prefix=key)['KeyCount']
 
 
+    def get_tail(self, key, byte_count=TAIL_BLOCK_SIZE_BYTE):
+        # get the last byte_count bytes of the value at a key 
+        response = self.s3.get_object(Bucket=self.bucket_name, Key=key, Range="bytes=-{}".format(byte_count))
+        return response["Body"].read()
+
+
+    def is_incomplete_output(self, key, data_path):
+        # check the end of the value at a key to find experiment outputs that are known to be incomplete 
+        try:
+            tail_data = self.get_tail(key)
+        except ClientError as e:
+            logging.error("Error: {} in get tail".format(e))
+            return False 
+        return OutputProbe(data_path).classify_block(tail_data) is False 
+
+
     def download(self, key, file_path):
         print("Downloading key {} to {}".format(key, file_path))
         try:
@@ -41,12 +59,20 @@ class S3Client:
 
     def sync(self):
         update_count = 0 
+        incomplete_count = 0 
         # sync the local directory to data in S3 bucket 
         for entry in self.data:
             key = entry['Key']
             size = entry['Size']
             split_key = key.split("/")
             data_path = self.data_dir.joinpath("/".join(split_key[1:]))
+
+            # skip incomplete experiment outputs, they are downloaded in a later sync once complete 
+            if (not data_path.exists() or not OutputProbe(data_path).is_complete()) and \
+                    self.is_incomplete_output(key, data_path):
+                incomplete_count += 1
+                continue 
+
             if data_path.parent.exists():
                 if not data_path.exists():
                     print("Key {} in path {} does not exist!".format(key, data_path))
@@ -62,7 +88,7 @@ class S3Client:
                 data_path.parent.mkdir(parents=True, exist_ok=True)
                 self.download(key, str(data_path.resolve()))
 
-        print("Updated: {}".format(update_count))
+        print("Updated: {}, Skipped incomplete: {}".format(update_count, incomplete_count))
 
 
     def delete(self, key):
@@ -1,11 +1,14 @@
 import pathlib 
 from collections import defaultdict
 
+from mtDB.db.OutputProbe import OutputProbe
+
 
 class Status:
     def __init__(self, data_dir=pathlib.Path.home().joinpath("mtdata")):
         self.data_dir = pathlib.Path(data_dir)
         self.machine_count = defaultdict(int)
+        self.incomplete_count = defaultdict(int)
         self._load()
     
 
@@ -13,14 +16,19 @@ class Status:
         for machine_dir in self.data_dir.iterdir():
             machine_id = machine_dir.name
             for workload_dir in machine_dir.iterdir():
-                self.machine_count[machine_id] += len(list(workload_dir.iterdir()))
+                for output_path in workload_dir.iterdir():
+                    self.machine_count[machine_id] += 1
+                    if not OutputProbe(output_path).is_complete():
+                        self.incomplete_count[machine_id] += 1
     
 
     def print_machine_count(self):
         machine_id_list = self.machine_count.keys()
         machine_id_list = sorted(machine_id_list)
         for machine_id in machine_id_list:
-            print("{:15s} - {}".format(machine_id, self.machine_count[machine_id]))
+            print("{:15s} - {} ({} incomplete)".format(machine_id, 
+                                                        self.machine_count[machine_id], 
+                                                        self.incomplete_count[machine_id]))
                     
     
 if __name__ == "__main__":
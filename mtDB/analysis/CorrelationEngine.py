@@ -0,0 +1,123 @@
+import numpy as np
+from scipy import stats
+
+
+def get_mask_group_list(x_mask, y_mask):
+    """ Group the x and y columns by their mask of valid rows. Returns a list with a tuple of the
+        index of the x columns, the index of the y columns and the mask of rows valid for both
+        for each pair of x and y masks with some valid rows.
+    """
+    mask_group_list = []
+    x_mask_array, x_group_array = np.unique(x_mask.T, axis=0, return_inverse=True)
+    y_mask_array, y_group_array = np.unique(y_mask.T, axis=0, return_inverse=True)
+    for x_group, x_group_mask in enumerate(x_mask_array):
+        x_column_index = np.nonzero(x_group_array.ravel() == x_group)[0]
+        for y_group, y_group_mask in enumerate(y_mask_array):
+            y_column_index = np.nonzero(y_group_array.ravel() == y_group)[0]
+            row_mask = x_group_mask & y_group_mask
+            if row_mask.sum() > 0:
+                mask_group_list.append((x_column_index, y_column_index, row_mask))
+    return mask_group_list
+
+
+""" This class computes the Pearson and Spearman correlation coefficients
+    and their p-values between every pair of a set of performance metrics
+    (x) and predictive metrics (y) of a group of rows at once. The columns
+    are standardized once and the sums needed for every pair of columns are
+    computed with a few matrix multiplications instead of a call to
+    scipy.stats.pearsonr per pair.
+
+    Rows where either value of a pair of columns is inf or NaN are ignored
+    for that pair only. The coefficients of a pair are NaN if the pair has
+    min_count or fewer valid rows or if either column is constant.
+"""
+class CorrelationEngine:
+    def __init__(self, min_count=10):
+        self.min_count = min_count
+
+
+    def _standardize(self, value_matrix, mask_matrix):
+        # center and scale each column using its valid values so that the sums of squares do not lose precision
+        count_array = mask_matrix.sum(axis=0)
+        masked_matrix = np.where(mask_matrix, value_matrix, 0.0)
+        mean_array = masked_matrix.sum(axis=0)/np.maximum(count_array, 1)
+        centered_matrix = np.where(mask_matrix, value_matrix - mean_array, 0.0)
+        std_array = np.sqrt((centered_matrix**2).sum(axis=0)/np.maximum(count_array, 1))
+        std_array[std_array == 0] = 1.0
+        return centered_matrix/std_array
+
+
+    def _get_masked_pearson(self, x_matrix, y_matrix, x_mask, y_mask):
+        # Pearson coefficient and number of valid rows of each pair of x and y columns
+        x_valid = x_mask.astype(np.float64)
+        y_valid = y_mask.astype(np.float64)
+        x_std = self._standardize(x_matrix, x_mask)
+        y_std = self._standardize(y_matrix, y_mask)
+
+        count_matrix = x_valid.T @ y_valid
+        x_sum = x_std.T @ y_valid
+        y_sum = x_valid.T @ y_std
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cov_matrix = x_std.T @ y_std - x_sum*y_sum/count_matrix
+            x_var = (x_std**2).T @ y_valid - x_sum**2/count_matrix
+            y_var = x_valid.T @ (y_std**2) - y_sum**2/count_matrix
+            corr_matrix = cov_matrix/np.sqrt(x_var*y_var)
+
+        # variance that is zero up to rounding means a constant column
+        tol = 1e-12 * count_matrix
+        corr_matrix[(x_var <= tol) | (y_var <= tol)] = np.nan
+        return np.clip(corr_matrix, -1.0, 1.0), count_matrix.astype(np.int64)
+
+
+    def _get_rank_pearson(self, x_matrix, y_matrix, x_mask, y_mask):
+        """ Pearson coefficient of the ranks of each pair of x and y columns. The ranks of a column
+            depend on the rows valid for a pair, so the columns are grouped by their mask and the
+            ranks are computed once for each pair of x and y masks.
+        """
+        corr_matrix = np.full((x_matrix.shape[1], y_matrix.shape[1]), np.nan)
+        for x_column_index, y_column_index, row_mask in get_mask_group_list(x_mask, y_mask):
+            x_rank = stats.rankdata(x_matrix[np.ix_(row_mask, x_column_index)], axis=0)
+            y_rank = stats.rankdata(y_matrix[np.ix_(row_mask, y_column_index)], axis=0)
+            rank_mask = np.ones(row_mask.sum(), dtype=bool)
+            group_corr, _ = self._get_masked_pearson(x_rank, y_rank,
+                                                        np.repeat(rank_mask[:, None], len(x_column_index), axis=1),
+                                                        np.repeat(rank_mask[:, None], len(y_column_index), axis=1))
+            corr_matrix[np.ix_(x_column_index, y_column_index)] = group_corr
+        return corr_matrix
+
+
+    def get_p_value(self, corr_matrix, count_matrix):
+        # two-sided p-value of the coefficients from the t-distribution with count - 2 degrees of freedom
+        dof_matrix = count_matrix - 2.0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t_matrix = corr_matrix*np.sqrt(dof_matrix/((1.0 - corr_matrix)*(1.0 + corr_matrix)))
+            p_matrix = 2*stats.t.sf(np.abs(t_matrix), np.maximum(dof_matrix, 1))
+        p_matrix[np.abs(corr_matrix) == 1.0] = 0.0
+        p_matrix[np.isnan(corr_matrix) | (dof_matrix <= 0)] = np.nan
+        return p_matrix
+
+
+    def get_corr(self, x_matrix, y_matrix):
+        """ Get a dict of matrices with a row per x column and a column per y column with the
+            number of valid rows ("count"), the Pearson coefficient ("pearson") and its p-value
+            ("pearson_p"), the Spearman coefficient ("spearman") and its p-value ("spearman_p").
+        """
+        x_matrix = np.asarray(x_matrix, dtype=np.float64)
+        y_matrix = np.asarray(y_matrix, dtype=np.float64)
+        x_mask = np.isfinite(x_matrix)
+        y_mask = np.isfinite(y_matrix)
+
+        pearson_matrix, count_matrix = self._get_masked_pearson(x_matrix, y_matrix, x_mask, y_mask)
+        spearman_matrix = self._get_rank_pearson(x_matrix, y_matrix, x_mask, y_mask)
+
+        # pairs with too few valid rows have no coefficients
+        small_mask = count_matrix <= self.min_count
+        pearson_matrix[small_mask] = np.nan
+        spearman_matrix[small_mask] = np.nan
+        return {
+            "count": count_matrix,
+            "pearson": pearson_matrix,
+            "pearson_p": self.get_p_value(pearson_matrix, count_matrix),
+            "spearman": spearman_matrix,
+            "spearman_p": self.get_p_value(spearman_matrix, count_matrix)
+        }
@@ -0,0 +1,121 @@
+import numpy as np
+
+from mtDB.analysis.CorrelationEngine import get_mask_group_list
+
+
+# maximum number of values in an array of resampled columns, the resamples are processed in batches below this size
+MAX_BATCH_VALUE_COUNT = 2**22
+
+
+""" This class computes bootstrap confidence intervals and permutation
+    p-values of the Pearson correlation coefficient of every pair of a set of
+    performance metrics (x) and predictive metrics (y) of a group of rows.
+    The resamples of all pairs are drawn as a matrix of row indices with a
+    row per resample and the coefficients of every resample and pair are
+    computed with a single einsum per batch of resamples.
+
+    The random number generator is seeded so the results are the same every
+    time for the same data. Like CorrelationEngine, rows where either value of
+    a pair is inf or NaN are ignored for that pair and pairs with min_count or
+    fewer valid rows have no results.
+"""
+class CorrelationResampler:
+    def __init__(self, resample_count=1000, confidence_level=0.95, min_count=3, seed=0):
+        self.resample_count = resample_count
+        self.confidence_level = confidence_level
+        self.min_count = min_count
+        self.seed = seed
+
+
+    def _get_batch_size(self, row_count, column_count):
+        # number of resamples in a batch so that the resampled columns are not too large
+        return max(1, min(self.resample_count, MAX_BATCH_VALUE_COUNT//max(1, row_count*column_count)))
+
+
+    def _get_batch_pearson(self, x_batch, y_batch):
+        # Pearson coefficient of each pair of columns in each resample of arrays of shape (resample, row, column)
+        x_centered = x_batch - x_batch.mean(axis=1, keepdims=True)
+        y_centered = y_batch - y_batch.mean(axis=1, keepdims=True)
+        cov_batch = np.einsum("rni,rnj->rij", x_centered, y_centered)
+        x_norm = np.sqrt(np.einsum("rni,rni->ri", x_centered, x_centered))
+        y_norm = np.sqrt(np.einsum("rnj,rnj->rj", y_centered, y_centered))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            corr_batch = cov_batch/(x_norm[:, :, None]*y_norm[:, None, :])
+        corr_batch[~np.isfinite(corr_batch)] = np.nan
+        return np.clip(corr_batch, -1.0, 1.0)
+
+
+    def _get_bootstrap_ci(self, x_matrix, y_matrix, rng):
+        # percentile bootstrap confidence interval of the coefficient of each pair of columns
+        row_count = len(x_matrix)
+        batch_size = self._get_batch_size(row_count, x_matrix.shape[1] + y_matrix.shape[1])
+        corr_batch_list = []
+        for batch_start in range(0, self.resample_count, batch_size):
+            index_matrix = rng.integers(0, row_count, size=(min(batch_size, self.resample_count - batch_start), row_count))
+            corr_batch_list.append(self._get_batch_pearson(x_matrix[index_matrix], y_matrix[index_matrix]))
+
+        corr_batch = np.concatenate(corr_batch_list)
+        tail_percent = 100*(1 - self.confidence_level)/2
+        with np.errstate(invalid="ignore"):
+            all_nan_mask = np.all(np.isnan(corr_batch), axis=0)
+            corr_batch[:, all_nan_mask] = 0.0
+            ci_low = np.nanpercentile(corr_batch, tail_percent, axis=0)
+            ci_high = np.nanpercentile(corr_batch, 100 - tail_percent, axis=0)
+        ci_low[all_nan_mask] = np.nan
+        ci_high[all_nan_mask] = np.nan
+        return ci_low, ci_high
+
+
+    def _get_permutation_p(self, x_matrix, y_matrix, rng):
+        """ Two-sided permutation p-value of the coefficient of each pair of columns. Permuting the rows
+            of y does not change its mean and norm, so the columns are centered once and the coefficient
+            of each permutation is a product of the centered x and the permuted centered y.
+        """
+        row_count = len(x_matrix)
+        x_centered = x_matrix - x_matrix.mean(axis=0)
+        y_centered = y_matrix - y_matrix.mean(axis=0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            norm_matrix = np.sqrt((x_centered**2).sum(axis=0))[:, None]*np.sqrt((y_centered**2).sum(axis=0))[None, :]
+            observed_corr = (x_centered.T @ y_centered)/norm_matrix
+
+        batch_size = self._get_batch_size(row_count, y_matrix.shape[1])
+        extreme_count = np.zeros(observed_corr.shape, dtype=np.int64)
+        for batch_start in range(0, self.resample_count, batch_size):
+            current_batch_size = min(batch_size, self.resample_count - batch_start)
+            permutation_matrix = np.argsort(rng.random((current_batch_size, row_count)), axis=1)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                corr_batch = np.einsum("ni,rnj->rij", x_centered, y_centered[permutation_matrix])/norm_matrix
+            # a small tolerance so that permutations with the same coefficient as observed are counted
+            extreme_count += (np.abs(corr_batch) >= np.abs(observed_corr) - 1e-12).sum(axis=0)
+
+        p_matrix = (extreme_count + 1)/(self.resample_count + 1)
+        p_matrix[~np.isfinite(observed_corr)] = np.nan
+        return p_matrix
+
+
+    def get_resampled_corr(self, x_matrix, y_matrix):
+        """ Get a dict of matrices with a row per x column and a column per y column with the lower
+            and upper bound of the bootstrap confidence interval of the Pearson coefficient
+            ("pearson_ci_low", "pearson_ci_high") and the permutation p-value ("permutation_p").
+        """
+        x_matrix = np.asarray(x_matrix, dtype=np.float64)
+        y_matrix = np.asarray(y_matrix, dtype=np.float64)
+        shape = (x_matrix.shape[1], y_matrix.shape[1])
+        result_map = {
+            "pearson_ci_low": np.full(shape, np.nan),
+            "pearson_ci_high": np.full(shape, np.nan),
+            "permutation_p": np.full(shape, np.nan)
+        }
+
+        rng = np.random.default_rng(self.seed)
+        for x_column_index, y_column_index, row_mask in get_mask_group_list(np.isfinite(x_matrix), np.isfinite(y_matrix)):
+            if row_mask.sum() <= self.min_count:
+                continue
+
+            x_group_matrix = x_matrix[np.ix_(row_mask, x_column_index)]
+            y_group_matrix = y_matrix[np.ix_(row_mask, y_column_index)]
+            pair_index = np.ix_(x_column_index, y_column_index)
+            result_map["pearson_ci_low"][pair_index], result_map["pearson_ci_high"][pair_index] = \
+                self._get_bootstrap_ci(x_group_matrix, y_group_matrix, rng)
+            result_map["permutation_p"][pair_index] = self._get_permutation_p(x_group_matrix, y_group_matrix, rng)
+        return result_map
@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+
+
+""" This class plans the groups of the rows of a DataFrame for a list of
+    grouping feature lists. Each grouping column is factorized once into
+    sorted integer codes and the group of each row is computed from the codes
+    instead of running a groupby per grouping feature list.
+
+    Grouping feature lists that are nested (e.g. [machine_id] and [machine_id,
+    workload_id]) are put in the same chain and share a single ordering of the
+    rows, sorted by the codes of the largest feature list of the chain, so that
+    the rows of every group of every feature list in the chain are a contiguous
+    slice of the ordered rows. The group key of a feature list is computed from
+    the key of the feature list before it in the chain and the codes of the
+    features it adds.
+
+    Like groupby, groups are ordered by their labels and rows where any
+    grouping feature is NaN are not in any group.
+"""
+class GroupingPlanner:
+    def __init__(self, df, grouping_feature_list_list):
+        self.row_count = len(df)
+
+        # sorted codes and labels of each grouping column and the string of each label used in names
+        self._code_map, self._label_map, self._label_str_map, self._numeric_label_map = {}, {}, {}, {}
+        for feature_name in set([feature_name for feature_list in grouping_feature_list_list for feature_name in feature_list]):
+            codes, labels = pd.factorize(df[feature_name], sort=True)
+            self._code_map[feature_name] = codes.astype(np.int64)
+            self._label_map[feature_name] = list(labels)
+            self._label_str_map[feature_name], self._numeric_label_map[feature_name] = [], []
+            for label in labels:
+                try:
+                    label_str = str(int(label))
+                    numeric_flag = True
+                except ValueError:
+                    label_str = str(label)
+                    numeric_flag = False
+                self._label_str_map[feature_name].append(label_str)
+                self._numeric_label_map[feature_name].append(numeric_flag)
+
+        # each chain is a list of feature lists where each feature list is a superset of the one before it
+        self._chain_list = []
+        self._chain_index_map = {}
+        # a feature list is added to the chain with the largest feature list that is a subset of it 
+        for feature_list in sorted(grouping_feature_list_list, key=len):
+            chain_index_list = [chain_index for chain_index, chain in enumerate(self._chain_list) if set(chain[-1]).issubset(feature_list)]
+            if len(chain_index_list) > 0:
+                chain_index = max(chain_index_list, key=lambda chain_index: len(self._chain_list[chain_index][-1]))
+                self._chain_list[chain_index].append(list(feature_list))
+                self._chain_index_map[tuple(feature_list)] = chain_index
+            else:
+                self._chain_index_map[tuple(feature_list)] = len(self._chain_list)
+                self._chain_list.append([list(feature_list)])
+
+        # order of the rows of each chain and the groups of each feature list as (code tuple, start, end)
+        self._order_list = []
+        self._group_map = {}
+        for chain in self._chain_list:
+            self._plan_chain(chain)
+
+
+    def _plan_chain(self, chain):
+        # order the rows by the codes of the features in the order they are added to the chain
+        chain_feature_list = []
+        for feature_list in chain:
+            chain_feature_list += [feature_name for feature_name in feature_list if feature_name not in chain_feature_list]
+        order = np.lexsort([self._code_map[feature_name] for feature_name in reversed(chain_feature_list)]) \
+                    if len(chain_feature_list) > 0 else np.arange(self.row_count)
+        self._order_list.append(order)
+
+        # the key of a row is updated with the codes of the features each feature list adds to the chain
+        key = np.zeros(self.row_count, dtype=np.int64)
+        valid_mask = np.ones(self.row_count, dtype=bool)
+        added_feature_list = []
+        for feature_list in chain:
+            for feature_name in feature_list:
+                if feature_name in added_feature_list:
+                    continue
+                added_feature_list.append(feature_name)
+                sorted_codes = self._code_map[feature_name][order]
+                key = key*(len(self._label_map[feature_name]) + 1) + sorted_codes + 1
+                valid_mask &= sorted_codes >= 0
+
+                # the rows are sorted by key so the key is replaced by the index of its group to keep it small
+                key = np.concatenate([[0], np.cumsum(np.diff(key) != 0)]) if self.row_count > 0 else key
+
+            # a group starts at each row where the key changes
+            start_array = np.concatenate([[0], np.flatnonzero(np.diff(key)) + 1]) if self.row_count > 0 else np.zeros(0, dtype=np.int64)
+            end_array = np.concatenate([start_array[1:], [self.row_count]]).astype(np.int64)
+            group_list = []
+            for start, end in zip(start_array, end_array):
+                if not valid_mask[start]:
+                    continue
+                row_index = order[start]
+                group_list.append((tuple([int(self._code_map[feature_name][row_index]) for feature_name in feature_list]), int(start), int(end)))
+            self._group_map[tuple(feature_list)] = group_list
+
+
+    def get_order(self, feature_list):
+        # order of the rows where the rows of each group of the feature list are contiguous
+        return self._order_list[self._chain_index_map[tuple(feature_list)]]
+
+
+    def iter_groups(self, feature_list):
+        """ Yield a tuple of the labels of the group, the string of each label, the flag indicating
+            whether each label is numeric, the start and end of the slice of rows of the group in
+            the rows ordered by get_order(feature_list) for each group of a feature list.
+        """
+        for code_tuple, start, end in self._group_map[tuple(feature_list)]:
+            label_tuple = tuple([self._label_map[feature_name][code] for feature_name, code in zip(feature_list, code_tuple)])
+            label_str_tuple = tuple([self._label_str_map[feature_name][code] for feature_name, code in zip(feature_list, code_tuple)])
+            numeric_tuple = tuple([self._numeric_label_map[feature_name][code] for feature_name, code in zip(feature_list, code_tuple)])
+            yield label_tuple, label_str_tuple, numeric_tuple, start, end
+
+
+    def get_group_count(self, feature_list):
+        return len(self._group_map[tuple(feature_list)])
@@ -0,0 +1,169 @@
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+
+
+# shared frame of the worker process, attached once when the worker starts
+_worker_frame = None
+
+
+def _attach_block(name):
+    # attach to a shared memory block without tracking it in the worker, the pool unlinks it (track is new in Python 3.13)
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+def _init_worker(spec):
+    global _worker_frame
+    _worker_frame = SharedFrame(spec)
+
+
+def _run_task(func_task):
+    func, task = func_task
+    return func(_worker_frame, task)
+
+
+""" This class is the view of a DataFrame in shared memory used by the tasks
+    of a SharedFramePool. The numeric columns are rows of a float64 matrix and
+    the other columns are rows of an int64 matrix of codes with the list of
+    labels of each column, both backed by shared memory blocks, so getting a
+    column does not copy any data.
+"""
+class SharedFrame:
+    def __init__(self, spec):
+        self.row_count = spec["row_count"]
+        self._block_list = []
+        self._numeric_index_map = {column_name: index for index, column_name in enumerate(spec["numeric_column_list"])}
+        self._code_index_map = {column_name: index for index, column_name in enumerate(spec["code_column_list"])}
+        self._label_map = spec["label_map"]
+        self._numeric_matrix = self._attach(spec["numeric_block_name"], len(self._numeric_index_map), np.float64)
+        self._code_matrix = self._attach(spec["code_block_name"], len(self._code_index_map), np.int64)
+
+
+    def _attach(self, block_name, column_count, dtype):
+        # zero-copy matrix with a row per column backed by a shared memory block
+        if block_name is None:
+            return np.empty((column_count, self.row_count), dtype=dtype)
+        block = _attach_block(block_name)
+        self._block_list.append(block)
+        return np.ndarray((column_count, self.row_count), dtype=dtype, buffer=block.buf)
+
+
+    def get_column(self, column_name):
+        # array of values of a numeric column
+        return self._numeric_matrix[self._numeric_index_map[column_name]]
+
+
+    def get_matrix(self, column_list, row_index=None):
+        # matrix with a column per numeric column in the list for all rows or the rows in row_index
+        column_index = [self._numeric_index_map[column_name] for column_name in column_list]
+        if row_index is None:
+            return self._numeric_matrix[column_index].T
+        return self._numeric_matrix[np.ix_(column_index, row_index)].T
+
+
+    def get_codes(self, column_name):
+        # array of codes of a non-numeric column, -1 for missing values
+        return self._code_matrix[self._code_index_map[column_name]]
+
+
+    def get_labels(self, column_name):
+        # list of labels of the codes of a non-numeric column
+        return self._label_map[column_name]
+
+
+    def close(self):
+        self._numeric_matrix = None
+        self._code_matrix = None
+        for block in self._block_list:
+            block.close()
+        self._block_list = []
+
+
+""" This class places the numeric columns of a DataFrame and the codes of
+    its other columns in shared memory once and runs tasks over them in a
+    pool of worker processes. Each worker attaches to the shared memory when
+    it starts, so the DataFrame is not pickled for every worker or task. A
+    task is a function called with the SharedFrame of the worker and an
+    argument, e.g. the row index of a group.
+
+    If there is a single worker, the tasks are run in this process. The
+    shared memory is released by close() or when used as a context manager.
+"""
+class SharedFramePool:
+    def __init__(self, df, workers=1, column_list=None):
+        self.workers = workers
+        if column_list is None:
+            column_list = list(df.columns)
+
+        numeric_column_list = [column_name for column_name in column_list if pd.api.types.is_numeric_dtype(df[column_name])]
+        code_column_list = [column_name for column_name in column_list if column_name not in numeric_column_list]
+        self._block_list = []
+
+        label_map = {}
+        code_matrix = np.empty((len(code_column_list), len(df)), dtype=np.int64)
+        for index, column_name in enumerate(code_column_list):
+            codes, labels = pd.factorize(df[column_name], sort=True)
+            code_matrix[index] = codes
+            label_map[column_name] = list(labels)
+
+        self.spec = {
+            "row_count": len(df),
+            "numeric_column_list": numeric_column_list,
+            "code_column_list": code_column_list,
+            "label_map": label_map,
+            "numeric_block_name": self._create_block([df[column_name].to_numpy(dtype=np.float64) for column_name in numeric_column_list],
+                                                        np.float64, len(df)),
+            "code_block_name": self._create_block(code_matrix, np.int64, len(df))
+        }
+
+        self.frame = SharedFrame(self.spec)
+        self._pool = None
+        if self.workers > 1:
+            self._pool = multiprocessing.Pool(self.workers, initializer=_init_worker, initargs=(self.spec,))
+
+
+    def _create_block(self, array_list, dtype, row_count):
+        # copy a list of columns to a new shared memory block, None if there are no values
+        if len(array_list) == 0 or row_count == 0:
+            return None
+        block = shared_memory.SharedMemory(create=True, size=len(array_list)*row_count*np.dtype(dtype).itemsize)
+        self._block_list.append(block)
+        matrix = np.ndarray((len(array_list), row_count), dtype=dtype, buffer=block.buf)
+        for index, array in enumerate(array_list):
+            matrix[index] = array
+        return block.name
+
+
+    def map(self, func, task_list):
+        """ Get the list of results of func(frame, task) for each task in the list in the same order.
+            The function must be defined at the top level of a module so that it can be pickled.
+        """
+        if self._pool is None:
+            return [func(self.frame, task) for task in task_list]
+        chunk_size = max(1, len(task_list)//(4*self.workers))
+        return self._pool.map(_run_task, [(func, task) for task in task_list], chunksize=chunk_size)
+
+
+    def close(self):
+        # stop the workers and release the shared memory
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+        self.frame.close()
+        for block in self._block_list:
+            block.close()
+            block.unlink()
+        self._block_list = []
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -1,7 +1,6 @@
 import pathlib 
-from collections import Counter, defaultdict 
+import numpy as np 
 import pandas as pd 
-from mtDB.cydonia.RDTraceProfiler import RDTraceProfiler
 from mtDB.db.ExperimentOutput import ExperimentOutput
 
 RD_TRACE_DIR = pathlib.Path("/research2/mtc/cp_traces/rd_traces_4k/")
@@ -16,8 +15,8 @@ class Cydonia:
     def __init__(self, st_output_path, mt_output_path, workload_name):
         self._st = ExperimentOutput(st_output_path)
         self._mt = ExperimentOutput(mt_output_path)
-        self._st_ts_keys = sorted(self._st.ts_stat.keys())
-        self._mt_ts_keys = sorted(self._mt.ts_stat.keys())
+        self._st_ts_keys = self._st.ts_stat.T
+        self._mt_ts_keys = self._mt.ts_stat.T
         self._end_st_key = self._st_ts_keys[-1]
         self._end_mt_key = self._mt_ts_keys[-1]
         self._workload = workload_name 
@@ -25,181 +24,58 @@ class Cydonia:
 
 
     def _load(self):
-        mt_row_list, st_row_list = [], []
-        st_prev_window_stats, mt_prev_window_stats = defaultdict(int), defaultdict(int)
-        st_future_stats, mt_future_stats = defaultdict(int), defaultdict(int)
-
-        # iterate through each key in MT time series 
-        for key_index, mt_key in enumerate(self._mt_ts_keys):
-            # only compare the overlapping period 
-            # if there are more keys in MT case then we break here 
-            # if there are more keys in ST case the loop would automatically break 
-            if key_index == len(self._st_ts_keys):
-                break 
-
-            # the timing is not perfect so we have to fetch the ST key separetely 
-            # for instance, we track at 30 second intervals and the time at the 
-            # second interval could be 60 in ST and 61 in MT 
-            st_key = self._st_ts_keys[key_index]
-
-            mt_row_json, st_row_json = {}, {}
-
-            """ For each window collect, 
-                - read IO processed in byte
-                - write IO processed in byte
-                - T1 hit byte 
-                - T1 miss byte
-                - T2 hit byte 
-                - Delta between ST and MT bandwidth 
-                - Delta between ST and MT block read/write Slat 
-                - Delta between ST and MT backing read/write lat 
-                - Delta IAT wait duration (due to workload)
-                - Delta load duration (due to system)
-
-                - Future read IO to be processed 
-                - Future write IO to be processed
-                - Future T1 hit byte 
-                - Future T1 miss byte 
-                - Future T2 hit byte 
-                - Future IAT wait duration 
-            """
-
-            st_window_stats, mt_window_stats = defaultdict(int), defaultdict(int)
-            st_window_stats["ts"], mt_window_stats["ts"] = st_key, mt_key
-            st_window_stats["len"], mt_window_stats["len"] = st_key - st_prev_window_stats["ts"], mt_key - mt_prev_window_stats["ts"]
-
-            """ Compute the amount of IO completed in the current, previous and future windows. IO processed in this window could 
-                have been submitted in the previous window. """
-            st_window_stats["readProcessedByte"] = self._st.ts_stat[st_key]["readIOProcessed"] - st_prev_window_stats["readProcessedByte"]
-            st_future_stats["readProcessedByte"] = self._st.ts_stat[self._end_st_key]["readIOProcessed"] - self._st.ts_stat[st_key]["readIOProcessed"] 
-            st_window_stats["writeProcessedByte"] = self._st.ts_stat[st_key]["writeIOProcessed"] - st_prev_window_stats["writeProcessedByte"]
-            st_future_stats["writeProcessedByte"] = self._st.ts_stat[self._end_st_key]["writeIOProcessed"] - self._st.ts_stat[st_key]["writeIOProcessed"] 
-
-            mt_window_stats["readProcessedByte"] = self._mt.ts_stat[mt_key]["readIOProcessed"] - mt_prev_window_stats["readProcessedByte"]
-            mt_future_stats["readProcessedByte"] = self._mt.ts_stat[self._end_mt_key]["readIOProcessed"] - self._mt.ts_stat[mt_key]["readIOProcessed"]
-            mt_window_stats["writeProcessedByte"] = self._mt.ts_stat[mt_key]["writeIOProcessed"] - mt_prev_window_stats["writeProcessedByte"]
-            mt_future_stats["writeProcessedByte"] = self._mt.ts_stat[self._end_mt_key]["writeIOProcessed"] - self._mt.ts_stat[mt_key]["writeIOProcessed"]
-
-            st_prev_window_stats["readProcessedByte"] = st_window_stats["readProcessedByte"]
-            st_prev_window_stats["writeProcessedByte"] = st_window_stats["writeProcessedByte"]
-            mt_prev_window_stats["readProcessedByte"] = mt_window_stats["readProcessedByte"]
-            mt_prev_window_stats["writeProcessedByte"] = mt_window_stats["writeProcessedByte"]
-
-            # compute the bandwidth of the current window and the change from previous window 
-            st_window_stats["bandwidth"] = (st_window_stats["readProcessedByte"] + st_window_stats["writeProcessedByte"])/st_window_stats["len"]
-            st_window_stats["deltaBandwidth"] = st_window_stats["bandwidth"] - st_prev_window_stats["bandwidth"]
-            st_window_stats["deltaPercentBandwidth"] = 100*st_window_stats["deltaBandwidth"]/st_prev_window_stats["bandwidth"]
-
-            st_prev_window_stats["bandwidth"] = st_window_stats["bandwidth"]
-            st_prev_window_stats["deltaBandwidth"] = st_window_stats["deltaBandwidth"]
-            st_prev_window_stats["deltaPercentBandwidth"] = st_window_stats["deltaPercentBandwidth"]
-
-            mt_window_stats["bandwidth"] = (mt_window_stats["readProcessedByte"] + mt_window_stats["writeProcessedByte"])/st_window_stats["len"]
-            mt_window_stats["deltaBandwidth"] = mt_window_stats["bandwidth"] - mt_prev_window_stats["bandwidth"]
-            mt_window_stats["deltaPercentBandwidth"] = 100*mt_window_stats["deltaBandwidth"]/mt_prev_window_stats["bandwidth"]
-
-            mt_prev_window_stats["bandwidth"] = mt_window_stats["bandwidth"]
-            mt_prev_window_stats["deltaBandwidth"] = mt_window_stats["deltaBandwidth"]
-            mt_prev_window_stats["deltaPercentBandwidth"] = mt_window_stats["deltaPercentBandwidth"]
-
-            mt_window_stats["bandwidthSTvsMT"] = (st_window_stats["bandwidth"] - mt_window_stats["bandwidth"])/st_window_stats["bandwidth"]
-            st_window_stats["bandwidthSTvsMT"] = mt_window_stats["bandwidthSTvsMT"]
-
-            mt_window_stats["deltaBandwidthSTvsMT"] = mt_window_stats["bandwidthSTvsMT"] - mt_prev_window_stats["bandwidthSTvsMT"]
-            mt_window_stats["deltaPercentBandwidthSTvsMT"] = 100*mt_window_stats["deltaBandwidthSTvsMT"]/mt_prev_window_stats["bandwidthSTvsMT"]
-
-            st_prev_window_stats["ts"], mt_prev_window_stats["ts"] = st_key, mt_key
-            st_prev_window_stats["bandwidthSTvsMT"], mt_prev_window_stats["bandwidthSTvsMT"] = mt_window_stats["bandwidthSTvsMT"], mt_window_stats["bandwidthSTvsMT"]
-
-
-            # the first key being compared 
-            if key_index == 0:
-                # read bytes process in this time window 
-                st_window_read_processed = self._st.ts_stat[st_key]["readIOProcessed"] 
-                mt_window_read_processed = self._mt.ts_stat[mt_key]["readIOProcessed"]
-
-                # read bytes to be processed in the future 
-                st_future_read_byte = self._st.ts_stat[self._mt_ts_keys[-1]]["readIOProcessed"] - st_window_read_processed
-                mt_future_read_byte = self._mt.ts_stat[self._mt_ts_keys[-1]]["readIOProcessed"] - mt_window_read_processed
-
-                # write requests 
-                st_window_write_byte_processed = self._st.ts_stat[st_key]["writeIOProcessed"] 
-                mt_window_write_byte_processed = self._mt.ts_stat[mt_key]["writeIOProcessed"] 
-
-                # read bytes to be processed in the future 
-                st_future_write = self._st.ts_stat[self._mt_ts_keys[-1]]["writeIOProcessed"] - st_window_write_byte_processed
-                mt_future_write = self._mt.ts_stat[self._mt_ts_keys[-1]]["writeIOProcessed"] - mt_window_write_byte_processed
-
-                # t1 hit bytes 
-                st_window_t1_hit_byte = self._st.ts_stat[st_key]["t1HitRate"] * st_window_read_processed
-                mt_window_t1_hit_byte = self._mt.ts_stat[mt_key]["t1HitRate"] * mt_window_read_processed
-
-                # t1 hit bytes in future 
-                st_future_t1_hit_byte = (self._st.ts_stat[self._mt_ts_keys[-1]]["t1HitRate"] - self._st.ts_stat[st_key]["t1HitRate"]) * st_future_read
-                mt_future_t1_hit_byte = (self._mt.ts_stat[self._mt_ts_keys[-1]]["t1HitRate"] - self._mt.ts_stat[mt_key]["t1HitRate"]) * mt_future_read
-
-                # t1 miss bytes 
-                st_window_t1_miss_byte = st_window_read_processed - st_window_t1_hit_byte
-                mt_window_t1_miss_byte = mt_window_read_processed - mt_window_t1_hit_byte
-
-                # t1 miss bytes in future 
-                st_t1_miss_byte = st_future_read_byte - st_future_t1_hit_byte
-                mt_t1_miss_byte = mt_future_read_byte - mt_future_t1_hit_byte
-
-                # t2 hit bytes 
-                st_window_t2_hit_byte = 0 
-                mt_window_t2_hit_byte = self._mt.ts_stat[mt_key]["t2HitRate"] * mt_window_t1_miss_byte
-            else:
-                pass 
-            
-            st_row_json["block_req_count_at_window_end"] = self._st.ts_stat[st_key]["blockReqCount"]
-            mt_row_json["block_req_count_at_window_end"] = self._mt.ts_stat[mt_key]["blockReqCount"]
-
-            st_row_json["bandwidth"] = self._st.ts_stat[st_key]["overallBandwidth"]
-            mt_row_json["bandwidth"] = self._mt.ts_stat[mt_key]["overallBandwidth"]
-
-            st_row_json["t1HitRate"] = self._st.ts_stat[st_key]["t1HitRate"] 
-            mt_row_json["t1HitRate"] = self._mt.ts_stat[mt_key]["t1HitRate"] 
-
-            st_row_json["t2HitRate"] = 0.0
-            mt_row_json["t2HitRate"] = self._mt.ts_stat[mt_key]["t2HitRate"] 
-
-            st_row_json["writeIOProcessed"] = self._st.ts_stat[st_key]["writeIOProcessed"] 
-            mt_row_json["writeIOProcessed"] = self._mt.ts_stat[mt_key]["writeIOProcessed"] 
-
-            st_row_json["readIOProcessed"] = self._st.ts_stat[st_key]["readIOProcessed"] 
-            mt_row_json["readIOProcessed"] = self._mt.ts_stat[mt_key]["readIOProcessed"] 
-
-            st_row_json["blockReadSLat_avg_ns"] = self._st.ts_stat[st_key]["blockReadSLat_avg_ns"] 
-            mt_row_json["blockReadSLat_avg_ns"] = self._mt.ts_stat[mt_key]["blockReadSLat_avg_ns"] 
-
-            st_row_json["blockWriteSLat_avg_ns"] = self._st.ts_stat[st_key]["blockWriteSLat_avg_ns"] 
-            mt_row_json["blockWriteSLat_avg_ns"] = self._mt.ts_stat[mt_key]["blockWriteSLat_avg_ns"] 
-
-            mt_row_json["T"] = int(mt_key)
-            st_row_json["T"] = int(st_key)
-
-
-
-            mt_row_list.append(mt_row_json)
-            st_row_list.append(st_row_json)
-
-        if len(mt_row_list) > 0:
-            mt_row_list[-1]["T"] = int(self._mt.get_runtime())
-            mt_row_list[-1]["bandwidth"] = self._mt.get_bandwidth()
-            mt_row_list[-1]["t1HitRate"] = self._mt.get_t1_hit_rate()
-            mt_row_list[-1]["t2HitRate"] = self._mt.get_t2_hit_rate()
-
-        if len(st_row_list) > 0:
-            st_row_list[-1]["T"] = int(self._st.get_runtime())
-            st_row_list[-1]["bandwidth"] = self._st.get_bandwidth()
-            st_row_list[-1]["t1HitRate"] = self._st.get_t1_hit_rate()
-            st_row_list[-1]["t2HitRate"] = self._st.get_t2_hit_rate()
-        
-        assert len(mt_row_list) > 0 and len(st_row_list) > 0 and len(mt_row_list) == len(st_row_list)
+        """ For each window collect, 
+            - read IO processed in byte
+            - write IO processed in byte
+            - T1 hit byte 
+            - T1 miss byte
+            - T2 hit byte 
+            - Delta between ST and MT bandwidth 
+            - Delta between ST and MT block read/write Slat 
+            - Delta between ST and MT backing read/write lat 
+            - Delta IAT wait duration (due to workload)
+            - Delta load duration (due to system)
+
+            - Future read IO to be processed 
+            - Future write IO to be processed
+            - Future T1 hit byte 
+            - Future T1 miss byte 
+            - Future T2 hit byte 
+            - Future IAT wait duration 
+        """
 
-        self.mt_df = pd.DataFrame(mt_row_list)
-        self.st_df = pd.DataFrame(st_row_list)
+        # compare the snapshots with the same index, the timing is not perfect so the time 
+        # of a snapshot could be 60 in ST and 61 in MT, only the overlapping period is compared 
+        aligner = self._mt.get_aligner(self._st, mode="index")
+        st_row_map, mt_row_map = {}, {}
+
+        st_row_map["block_req_count_at_window_end"], mt_row_map["block_req_count_at_window_end"] = aligner.get_series("blockReqCount")
+        st_row_map["bandwidth"], mt_row_map["bandwidth"] = aligner.get_series("overallBandwidth")
+        st_row_map["t1HitRate"], mt_row_map["t1HitRate"] = aligner.get_series("t1HitRate")
+        st_row_map["t2HitRate"] = np.zeros(len(aligner))
+        mt_row_map["t2HitRate"] = aligner.get_mt_series("t2HitRate")
+        st_row_map["writeIOProcessed"], mt_row_map["writeIOProcessed"] = aligner.get_series("writeIOProcessed")
+        st_row_map["readIOProcessed"], mt_row_map["readIOProcessed"] = aligner.get_series("readIOProcessed")
+        st_row_map["blockReadSLat_avg_ns"], mt_row_map["blockReadSLat_avg_ns"] = aligner.get_series("blockReadSLat_avg_ns")
+        st_row_map["blockWriteSLat_avg_ns"], mt_row_map["blockWriteSLat_avg_ns"] = aligner.get_series("blockWriteSLat_avg_ns")
+        st_row_map["T"], mt_row_map["T"] = aligner.st_T.astype(int), aligner.mt_T.astype(int)
+
+        assert len(aligner) > 0
+
+        self.mt_df = pd.DataFrame(mt_row_map)
+        self.st_df = pd.DataFrame(st_row_map)
+
+        # the last row has the overall stats of the experiment 
+        last_index = self.mt_df.index[-1]
+        self.mt_df.loc[last_index, "T"] = int(self._mt.get_runtime())
+        self.mt_df.loc[last_index, "bandwidth"] = self._mt.get_bandwidth()
+        self.mt_df.loc[last_index, "t1HitRate"] = self._mt.get_t1_hit_rate()
+        self.mt_df.loc[last_index, "t2HitRate"] = self._mt.get_t2_hit_rate()
+
+        self.st_df.loc[last_index, "T"] = int(self._st.get_runtime())
+        self.st_df.loc[last_index, "bandwidth"] = self._st.get_bandwidth()
+        self.st_df.loc[last_index, "t1HitRate"] = self._st.get_t1_hit_rate()
+        self.st_df.loc[last_index, "t2HitRate"] = self._st.get_t2_hit_rate()
 
 
     def run(self):
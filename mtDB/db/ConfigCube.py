@@ -0,0 +1,159 @@
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+
+# features that are the axes of the cube, the config of an experiment is the tuple of CONFIG_FEATURE_LIST
+AXIS_LIST = ["machine_id", "workload_id", "config", "cacheSizeMB", "nvmCacheSizeMB"]
+CONFIG_FEATURE_LIST = ["inputQueueSize", "processorThreadCount", "scaleIAT"]
+
+# metrics of the cube if no metrics are specified
+DEFAULT_METRIC_LIST = ["bandwidth_byte/s", "t1HitRate", "t2HitRate", "blockReadSlat_avg_ns", "blockWriteSlat_avg_ns",
+                        "blockReadSlat_p99_ns", "blockWriteSlat_p99_ns", "backingReadLat_avg_ns", "backingWriteLat_avg_ns"]
+
+
+""" This class stores metrics of experiment sets in a dense array per
+    metric where the axes are the machine, workload, config (queue size,
+    thread count, iat scale), tier-1 size and tier-2 size. The value at
+    the index of each axis is NaN if there is no experiment set for it.
+
+    The labels of each axis are sorted and mapped to their index so that
+    getting the values of a metric for any combination of axis labels,
+    like all (t1, t2) sizes of a machine, workload and config, is an
+    index operation on the array instead of filtering a DataFrame.
+
+    The array of a metric is only built the first time it is used as the
+    arrays are mostly NaN and every array has the size of the whole cube.
+"""
+class ConfigCube:
+    def __init__(self, df, metric_list=None):
+        # DataFrame with a row per experiment set with the columns in AXIS_LIST (except config)
+        # and CONFIG_FEATURE_LIST, by default the metrics are the ones in DEFAULT_METRIC_LIST
+        if metric_list is None:
+            metric_list = [metric_name for metric_name in DEFAULT_METRIC_LIST if metric_name in df.columns]
+        for metric_name in metric_list:
+            if metric_name not in df.columns:
+                raise ValueError("Metric {} not in DataFrame".format(metric_name))
+        self.metric_list = metric_list
+
+        # sorted labels of each axis and the map of each label to its index
+        self._label_map = {}
+        self._index_map = {}
+        code_list = []
+        for axis_name in AXIS_LIST:
+            if axis_name == "config":
+                axis_values = pd.Series(list(zip(*[df[feature_name].astype(int) for feature_name in CONFIG_FEATURE_LIST])),
+                                            index=df.index, dtype=object)
+            elif axis_name in ["machine_id", "workload_id"]:
+                axis_values = df[axis_name]
+            else:
+                axis_values = df[axis_name].astype(int)
+
+            codes, labels = pd.factorize(axis_values, sort=True)
+            self._label_map[axis_name] = list(labels)
+            self._index_map[axis_name] = {label: index for index, label in enumerate(labels)}
+            code_list.append(codes)
+
+        # each experiment set must have a distinct index in the cube
+        self.shape = tuple([len(self._label_map[axis_name]) for axis_name in AXIS_LIST])
+        flat_index = np.ravel_multi_index(tuple(code_list), self.shape) if len(df) > 0 else np.zeros(0, dtype=np.int64)
+        unique_index, unique_count = np.unique(flat_index, return_counts=True)
+        if np.any(unique_count > 1):
+            duplicate_index = np.unravel_index(unique_index[np.argmax(unique_count > 1)], self.shape)
+            raise ValueError("Multiple experiment sets with labels {}".format(
+                {axis_name: self._label_map[axis_name][index] for axis_name, index in zip(AXIS_LIST, duplicate_index)}))
+
+        # the index of each experiment set and the values of each metric, the array of a metric with a
+        # dimension per axis is built on first access
+        self._code_tuple = tuple(code_list)
+        self._value_map = {metric_name: df[metric_name].to_numpy(dtype=np.float64) for metric_name in self.metric_list}
+        self._cube_map = {}
+
+
+    def get_labels(self, axis_name):
+        # sorted labels of an axis
+        return self._label_map[axis_name]
+
+
+    def get_cube(self, metric_name):
+        # the array of a metric with a dimension per axis in AXIS_LIST
+        if metric_name not in self._cube_map:
+            cube = np.full(self.shape, np.nan)
+            cube[self._code_tuple] = self._value_map[metric_name]
+            self._cube_map[metric_name] = cube
+        return self._cube_map[metric_name]
+
+
+    def _get_key(self, label_map):
+        # index into the array for a map of axis name to label, all labels of an axis not in the map are selected
+        key = []
+        for axis_name in AXIS_LIST:
+            label = label_map.get(axis_name)
+            if label is None:
+                key.append(slice(None))
+            else:
+                if axis_name == "config":
+                    label = tuple([int(value) for value in label])
+                elif axis_name not in ["machine_id", "workload_id"]:
+                    label = int(label)
+                key.append(self._index_map[axis_name][label])
+        return tuple(key)
+
+
+    def get(self, metric_name, machine_id=None, workload_id=None, config=None, cacheSizeMB=None, nvmCacheSizeMB=None):
+        """ Get the value of a metric for the labels specified. Axes without a label are kept
+            in the array returned, e.g. get("bandwidth_byte/s", "c220g1", "w82", (128, 16, 100))
+            returns the array of bandwidth of each tier-1 (rows) and tier-2 size (columns).
+            Raises a KeyError if a label is not in the cube.
+        """
+        return self.get_cube(metric_name)[self._get_key({
+            "machine_id": machine_id,
+            "workload_id": workload_id,
+            "config": config,
+            "cacheSizeMB": cacheSizeMB,
+            "nvmCacheSizeMB": nvmCacheSizeMB
+        })]
+
+
+    def argmax(self, metric_name, machine_id=None, workload_id=None, config=None, cacheSizeMB=None, nvmCacheSizeMB=None):
+        """ Get the map of axis name to label of the experiment set with the highest value of a
+            metric among the experiment sets with the labels specified. Returns None if there
+            are no experiment sets with the labels specified.
+        """
+        label_map = {
+            "machine_id": machine_id,
+            "workload_id": workload_id,
+            "config": config,
+            "cacheSizeMB": cacheSizeMB,
+            "nvmCacheSizeMB": nvmCacheSizeMB
+        }
+        key = self._get_key(label_map)
+        sub_cube = self.get_cube(metric_name)[key]
+        if np.all(np.isnan(sub_cube)):
+            return None
+
+        sub_index = np.unravel_index(np.nanargmax(sub_cube), np.shape(sub_cube))
+        free_axis_list = [axis_name for axis_name, axis_key in zip(AXIS_LIST, key) if isinstance(axis_key, slice)]
+        argmax_map = dict(label_map)
+        for axis_name, index in zip(free_axis_list, sub_index):
+            argmax_map[axis_name] = self._label_map[axis_name][index]
+        return argmax_map
+
+
+    def plot_heatmap(self, metric_name, machine_id, workload_id, config, output_path, label=None):
+        # heatmap of a metric across the grid of tier-1 and tier-2 sizes of a machine, workload and config
+        grid = self.get(metric_name, machine_id, workload_id, config)
+
+        _, ax = plt.subplots(figsize=[14, 10])
+        image = ax.imshow(grid, origin="lower", aspect="auto")
+        ax.set_xticks(range(len(self._label_map["nvmCacheSizeMB"])))
+        ax.set_xticklabels(self._label_map["nvmCacheSizeMB"])
+        ax.set_yticks(range(len(self._label_map["cacheSizeMB"])))
+        ax.set_yticklabels(self._label_map["cacheSizeMB"])
+        ax.set_xlabel("Tier-2 cache size (MB)")
+        ax.set_ylabel("Tier-1 cache size (MB)")
+        plt.colorbar(image, ax=ax, label=metric_name if label is None else label)
+
+        plt.tight_layout()
+        plt.savefig(output_path)
+        plt.close()
@@ -1,9 +1,36 @@
 
 import pathlib 
+import warnings
+import numpy as np 
 import pandas as pd 
 from collections import defaultdict
 
 from mtDB.db.ExperimentOutput import ExperimentOutput
+from mtDB.db.OutputProbe import OutputProbe
+from mtDB.db.DiffEngine import DiffEngine, get_opt_count
+from mtDB.db.RunningAggregate import RunningAggregate
+
+
+# ways to compute the statistics of an experiment set from multiple iterations of the experiment 
+EVAL_LIST = ["mean", "best", "median", "trimmed-mean"]
+
+# proportion of iterations removed from each end of the sorted values of a metric for the trimmed mean 
+TRIM_PROPORTION = 0.2
+
+# features that represent a unique experiment, iterations of an experiment have the same features 
+EXPERIMENT_SET_FEATURE_LIST = ["inputQueueSize", "processorThreadCount", "scaleIAT", "cacheSizeMB", "nvmCacheSizeMB"]
+
+
+def load_complete_output(output_path, cache=None, lazy=True):
+    # load an output file if it is complete, otherwise return None 
+    # this is a function so that it can be used by worker processes when loading in parallel 
+    if not OutputProbe(output_path).is_complete():
+        return None 
+
+    output = ExperimentOutput(output_path, cache=cache, lazy=lazy)
+    if not output.is_output_complete():
+        return None 
+    return output 
 
 
 """ This class stores data and statistics related to  
@@ -20,10 +47,24 @@ class DBUnit:
                     workload_id,
                     eval,
                     min_iteration = 3,
-                    grouping_features=["inputQueueSize", "processorThreadCount", "scaleIAT", "cacheSizeMB", "nvmCacheSizeMB"]):
+                    grouping_features=["inputQueueSize", "processorThreadCount", "scaleIAT", "cacheSizeMB", "nvmCacheSizeMB"],
+                    cache=None,
+                    lazy=True,
+                    output_path_list=None,
+                    loaded_output_list=None,
+                    run_analysis=True):
         # directory containing experiment output files 
         self._data_dir = pathlib.Path(data_dir)
 
+        # output files to load, all files in the data directory are loaded if not specified 
+        if output_path_list is None:
+            output_path_list = sorted(self._data_dir.iterdir())
+        self._output_path_list = output_path_list 
+
+        # outputs already loaded from the output files (e.g. by worker processes), None for 
+        # output files that are incomplete, the output files are loaded if not specified 
+        self._loaded_output_list = loaded_output_list 
+
         # evaluation technique to compute the statistics from multiple iteration of the same experiment 
         self._eval = eval 
 
@@ -33,18 +74,44 @@ class DBUnit:
         # minimum number of iteration per experiment to be considered a complete set 
         self._min_iteration = min_iteration
 
-        # list of all ExperimentOutput classes 
-        self.output_list = []
+        # OutputCache used to avoid parsing output files that have not changed 
+        self._cache = cache 
+
+        # only load the time series of an output file when it is accessed 
+        self._lazy = lazy 
+
+        # list of all ExperimentOutput classes and the path of each, the outputs are not stored when the 
+        # DBUnit is pickled (see __getstate__) and are loaded again from their paths on first access 
+        self._output_list = []
+        self._complete_path_list = []
+
+        # map of experiment config (queue size, thread count, iat scale, t1 size, t2 size) to 
+        # the list of ExperimentOutput classes of each iteration of the experiment 
+        self._output_map = defaultdict(list)
 
         # main df contains the raw data on each experiment 
         self._main_df = pd.DataFrame()
 
+        # map of experiment config to the running aggregates of the metrics of its iterations, the values 
+        # of the metrics of each iteration are in the order of the columns in self._column_list 
+        self._aggregate_map = {}
+        self._column_list = []
+        self._column_index_map = {}
+
+        # map of experiment config to the index of the rows of its iterations in self._main_df and to the 
+        # median and trimmed mean of its iterations, which are computed again only when it has new iterations 
+        self._set_row_map = {}
+        self._set_stat_map = {}
+
         # set df contains the data on each experiment set (multiple iterations with same parameters)
+        # the set df of each eval type in EVAL_LIST is computed and the one of self._eval is used by default 
         self._experiment_set_df = pd.DataFrame()
+        self._experiment_set_df_map = {}
 
         # diff dif contains the percentage difference between statistics of an MT cache and an 
         # ST cache with the identically sized tier-1 cache 
         self._diff_df = pd.DataFrame()
+        self._diff_df_map = {}
 
         # feature used to group a set of experiments as one 
         # experiment having the same thread count, queue size, iat scale, t1 size and t2 size are considered the same 
@@ -56,41 +123,165 @@ class DBUnit:
         self.st_opt_count = 0 
 
         self._load()
-        self._run_mt_analysis()
+
+        # the analysis can be skipped so that the diff df of many DBUnits is computed at once (see MTDB) 
+        if run_analysis:
+            self._run_mt_analysis()
 
 
     def _load(self):
         # load self._main_df and self._experiment_set_df with data from output files 
-        json_list = []
-        for data_file_path in self._data_dir.iterdir():
-            output = ExperimentOutput(data_file_path)
-            if output.is_output_complete():
-                # collect a list of JSON features from each experiment output and create a dataframe 
-                row = output.get_row()
-                row['index'] = len(self.output_list)
-                json_list.append(row)
-                self.output_list.append(output)
-        self._main_df = pd.DataFrame(json_list)
+        loaded_output_list = self._loaded_output_list
+        if loaded_output_list is None:
+            loaded_output_list = [load_complete_output(data_file_path, cache=self._cache, lazy=self._lazy) \
+                                    for data_file_path in self._output_path_list]
+        self._loaded_output_list = None 
+        self._add_output_list(loaded_output_list)
+
+
+    def add_outputs(self, output_path_list, loaded_output_list=None, run_analysis=True):
+        """ Add the output files of new iterations to this DBUnit. The running aggregates of 
+            the experiment sets are updated with only the new iterations so the output files 
+            that were loaded before are not read again. 
+        """
+        if loaded_output_list is None:
+            loaded_output_list = [load_complete_output(data_file_path, cache=self._cache, lazy=self._lazy) \
+                                    for data_file_path in output_path_list]
+        self._output_path_list = list(self._output_path_list) + list(output_path_list)
+        self._add_output_list(loaded_output_list)
+
+        if run_analysis:
+            self._run_mt_analysis()
+
+
+    def _add_output_list(self, loaded_output_list):
+        # add the rows of complete outputs to self._main_df and update the experiment sets 
+        row_list = []
+        try:
+            for output in loaded_output_list:
+                if output is not None:
+                    # collect a list of JSON features from each experiment output and create a dataframe 
+                    row = output.get_row()
+                    row['index'] = len(self._complete_path_list)
+                    self._update_aggregate(row)
+                    row_list.append(row)
+                    self._complete_path_list.append(output._output_path)
+                    if self._output_list is not None:
+                        self._output_list.append(output)
+                        self._output_map[self._get_output_config(output)].append(output)
+        except KeyError:
+            raise ValueError("Grouping error some feature not available")
+
+        if len(row_list) > 0:
+            if self._main_df.size > 0:
+                self._main_df = pd.concat([self._main_df, pd.DataFrame(row_list)], ignore_index=True)
+            else:
+                self._main_df = pd.DataFrame(row_list)
 
         # group the data for the same experiment (multiple iterations) together to compute aggregate 
-        # metrics based on the evaluation method (mean, best)
+        # metrics based on each evaluation method (mean, best, median, trimmed-mean)
         if self._main_df.size > 0:
-            try:
-                # group by the feature set that represent a unique experiment 
-                # ["inputQueueSize", "processorThreadCount", "scaleIAT", "cacheSizeMB", "nvmCacheSizeMB"]
-                # the numerous occurences of the same set of features are additional iteration of the experiment 
-                experiment_set_feature_list = []
-                for _, df in self._main_df.groupby(["inputQueueSize", "processorThreadCount", "scaleIAT", "cacheSizeMB", "nvmCacheSizeMB"]):
-                    if self._eval == "mean" and df.size >= self._min_iteration:
-                        # mean of all features in the set 
-                        experiment_set_feature_list.append(df.mean())
-                    elif self._eval == "best" and df.size >= self._min_iteration:
-                        # take the entry with the highest bandwidth 
-                        experiment_set_feature_list.append(df[df["bandwidth_byte/s"]==df["bandwidth_byte/s"].max()].iloc[0])
-                
-                self._experiment_set_df = pd.DataFrame(experiment_set_feature_list)
-            except:
-                raise ValueError("Grouping error some feature not available")
+            self._experiment_set_df_map = self._get_experiment_set_df_map()
+            self._experiment_set_df = self._experiment_set_df_map.get(self._eval, pd.DataFrame())
+
+
+    def _update_aggregate(self, row):
+        # update the running aggregates of the experiment set of a row 
+        for column_name in row:
+            if column_name not in self._column_index_map:
+                self._column_index_map[column_name] = len(self._column_list)
+                self._column_list.append(column_name)
+
+        value_array = np.full(len(self._column_list), np.nan)
+        for column_name, value in row.items():
+            value_array[self._column_index_map[column_name]] = value 
+
+        set_key = tuple([float(row[feature_name]) for feature_name in EXPERIMENT_SET_FEATURE_LIST])
+        if set_key not in self._aggregate_map:
+            self._aggregate_map[set_key] = RunningAggregate()
+            self._set_row_map[set_key] = []
+        self._aggregate_map[set_key].update(value_array, self._column_index_map["bandwidth_byte/s"])
+        self._set_row_map[set_key].append(row["index"])
+        self._set_stat_map.pop(set_key, None)
+
+
+    def _get_set_stat(self, set_key, column_list):
+        """ Get the median and the trimmed mean of each column in column_list of the iterations of an 
+            experiment set. They are computed from the rows of the set only and kept until the set 
+            has new iterations. 
+        """
+        if set_key not in self._set_stat_map:
+            value_matrix = self._main_df.iloc[self._set_row_map[set_key]].to_numpy(dtype=np.float64)
+            iteration_count = len(value_matrix)
+            trim_count = int(np.floor(iteration_count * TRIM_PROPORTION))
+
+            # NaN values are sorted last so the values kept are the ones ranked after trim_count and 
+            # up to iteration_count - trim_count among the values that are not NaN, like pandas rank 
+            trimmed_matrix = np.sort(value_matrix, axis=0)[trim_count:iteration_count - trim_count]
+            with warnings.catch_warnings():
+                # a column that is NaN in every iteration is NaN 
+                warnings.simplefilter("ignore", category=RuntimeWarning)
+                median_array = np.nanmedian(value_matrix, axis=0)
+                trimmed_mean_array = np.nanmean(trimmed_matrix, axis=0)
+
+            # the features of the set are its key instead of the statistics of identical values 
+            for feature_index, feature_name in enumerate(EXPERIMENT_SET_FEATURE_LIST):
+                median_array[column_list.index(feature_name)] = set_key[feature_index]
+                trimmed_mean_array[column_list.index(feature_name)] = set_key[feature_index]
+            self._set_stat_map[set_key] = (median_array, trimmed_mean_array)
+
+        # columns added after the statistics were computed are not in any iteration of the set 
+        pad_array = np.full(len(column_list) - len(self._set_stat_map[set_key][0]), np.nan)
+        return [np.concatenate([stat_array, pad_array]) for stat_array in self._set_stat_map[set_key]]
+
+
+    def _get_experiment_set_df_map(self):
+        """ Get the map of each eval type in EVAL_LIST to the df with a row per experiment set. 
+            The numerous occurences of the same set of features in EXPERIMENT_SET_FEATURE_LIST 
+            are additional iteration of the experiment. The mean and best are read from the 
+            running aggregates while the median and trimmed mean are only computed again for 
+            the experiment sets with new iterations. 
+        """
+        column_list = list(self._main_df.columns)
+
+        # an experiment set is used if the size (rows x columns) of its df is at least min_iteration 
+        set_key_list = [set_key for set_key in sorted(self._aggregate_map) \
+                            if self._aggregate_map[set_key].iteration_count * len(column_list) >= self._min_iteration]
+
+        # mean of all features in the set and the entry with the highest bandwidth 
+        mean_df = pd.DataFrame([self._aggregate_map[set_key].get_mean(len(column_list)) for set_key in set_key_list],
+                                columns=self._column_list)
+        best_df = pd.DataFrame([self._aggregate_map[set_key].get_best(len(column_list)) for set_key in set_key_list],
+                                columns=self._column_list)
+
+        # median of all features in the set and the mean of the values of each feature in the set after 
+        # removing the lowest and highest values 
+        set_stat_list = [self._get_set_stat(set_key, column_list) for set_key in set_key_list]
+        median_df = pd.DataFrame([set_stat[0] for set_stat in set_stat_list], columns=column_list)
+        trimmed_mean_df = pd.DataFrame([set_stat[1] for set_stat in set_stat_list], columns=column_list)
+
+        return {
+            "mean": mean_df[column_list],
+            "best": best_df[column_list],
+            "median": median_df,
+            "trimmed-mean": trimmed_mean_df
+        }
+
+
+    def get_iteration_variance_df(self):
+        # sample variance of each metric across the iterations of each experiment set along with the number of iterations 
+        set_key_list = sorted(self._aggregate_map.keys())
+        variance_df = pd.DataFrame([self._aggregate_map[set_key].get_variance(len(self._column_list)) for set_key in set_key_list],
+                                    columns=self._column_list)
+        if len(variance_df) == 0:
+            return variance_df 
+
+        for feature_index, feature_name in enumerate(EXPERIMENT_SET_FEATURE_LIST):
+            variance_df[feature_name] = [set_key[feature_index] for set_key in set_key_list]
+        variance_df["iterationCount"] = [self._aggregate_map[set_key].iteration_count for set_key in set_key_list]
+        variance_df["machine_id"] = self._machine_id 
+        variance_df["workload_id"] = self._workload_id 
+        return variance_df 
     
 
     def get_st_mt_pairs(self):
@@ -109,113 +300,83 @@ class DBUnit:
         return st_mt_pairs
 
 
+    def _get_output_config(self, output):
+        # the config of the experiment of an output 
+        return (output.input_queue_size, 
+                    output.processor_thread_count, 
+                    output.iat_scale_factor, 
+                    output.ram_cache_size_mb, 
+                    output.nvm_cache_size_mb)
+
+
+    def _load_outputs(self):
+        # load the complete outputs from the paths of their output files if the DBUnit was unpickled 
+        if self._output_list is not None:
+            return 
+        self._output_list, self._output_map = [], defaultdict(list)
+        for output_path in self._complete_path_list:
+            output = ExperimentOutput(output_path, cache=self._cache, lazy=self._lazy)
+            self._output_list.append(output)
+            self._output_map[self._get_output_config(output)].append(output)
+
+
+    @property
+    def output_list(self):
+        # list of complete ExperimentOutput 
+        self._load_outputs()
+        return self._output_list
+
+
+    def __getstate__(self):
+        # the outputs are not pickled (e.g. in the manifest) since they can have the whole time series 
+        state = self.__dict__.copy()
+        state["_output_list"] = None 
+        state["_output_map"] = None 
+        return state 
+
+
+    def get_outputs_per_row(self, row):
+        # list of complete ExperimentOutput of each iteration of the experiment in a row 
+        self._load_outputs()
+        return self._output_map.get((int(row["inputQueueSize"]), 
+                                        int(row["processorThreadCount"]),
+                                        int(row["scaleIAT"]),
+                                        int(row["cacheSizeMB"]),
+                                        int(row["nvmCacheSizeMB"])), [])
+
+
     def get_output_files_per_row(self, row):
-        output_file_name_prefix = "{}_{}_{}_{}_{}".format(int(row["inputQueueSize"]), 
-                                                            int(row["processorThreadCount"]),
-                                                            int(row["scaleIAT"]),
-                                                            int(row["cacheSizeMB"]),
-                                                            int(row["nvmCacheSizeMB"]))
-        output_file_list = []
-        for cur_output_file in self._data_dir.iterdir():
-            cur_file_name = cur_output_file.name 
-            if output_file_name_prefix in cur_file_name:
-                output_file_list.append(cur_output_file)
-        
-        return output_file_list
+        # list of paths of complete output files of each iteration of the experiment in a row 
+        return [output._output_path for output in self.get_outputs_per_row(row)]
 
 
     def _run_mt_analysis(self):
         """ For each MT cache with a corresponding ST cache with same tier 1 size collect, 
             percentage difference of all performance metrics. 
         """
-
-        diff_row_list = []
-        # group based on T1 size 
-        if self._experiment_set_df.size > 0:
-            for _, df in self._experiment_set_df.groupby(["inputQueueSize", "processorThreadCount", "scaleIAT", "cacheSizeMB"]):
-                # check if an ST cache exists (T1>0, T2=0)
-                st_df = df[(df["cacheSizeMB"]>0) & (df["nvmCacheSizeMB"]==0)]
-
-                # TODO: fix what to do with ST and MT opt HMR list could plot it? 
-                st_opt_hmr_list = []
-                mt_opt_hmr_list = []
-
-                # if an ST and an MT cache exists, we can compare! 
-                if len(st_df)>0 and (len(df)-len(st_df))>0:
-                    st_row = st_df.iloc[0]
-                    # lets compare ST output with different MT outputs 
-                    for _, row in df.iterrows():
-                        if ((row["cacheSizeMB"]>0) & (row["nvmCacheSizeMB"] > 0)):
-
-                            # collect percentage difference between every metric 
-                            diff_row = row - st_row
-                            diff_row = 100*diff_row/st_row
-
-                            # reset some metrics where percentage difference doesn't apply 
-                            diff_row[["inputQueueSize", "processorThreadCount", "scaleIAT"]] = row[["inputQueueSize", "processorThreadCount", "scaleIAT"]]
-                            diff_row[["cacheSizeMB", "nvmCacheSizeMB"]] = row[["cacheSizeMB", "nvmCacheSizeMB"]]
-                            diff_row[["t1HitRate", "t2HitRate"]] = row[["t1HitRate", "t2HitRate"]]
-                            diff_row["hmrc1"] = row["hmrc1"]
-                            diff_row["t2HitCount"] = row["t2HitCount"]
-                            diff_row["writeIORatio"] = row["backingWriteIORequested_byte"]/row["backingIORequested_byte"]
-                            diff_row["writeReqRatio"] = row["blockWriteReqCount"]/row["blockReqCount"]
-
-                            # update alloc and find counts along with total and mean net latency change 
-
-                            # the number of find is the total get request 
-                            diff_row["findLatIncrease"] = row["t1GetCount"] * (row["findLat_avg_ns"]-st_row["findLat_avg_ns"])/1e9
-
-                            # the number of alloc is the total write request + get miss count 
-                            diff_row["allocLatIncrease"] = row["allocationCount"] * (row["allocLat_avg_ns"]-st_row["allocLat_avg_ns"])/1e9
-                            diff_row["loadLatIncrease"] =  row["blockReqCount"] * (row["loadDuration_avg_us"] - st_row["loadDuration_avg_us"])*1000/1e9
-
-                            diff_row["overhead"] = diff_row["findLatIncrease"] + diff_row["allocLatIncrease"] + diff_row["loadLatIncrease"]
-
-                            diff_row["t2Gain"] = ((st_row["backingReadLat_avg_ns"] - (row["t2ReadLat_avg_us"]*1000)) * row["t2HitCount"])/1e9
-                            diff_row["backingWriteGain"] = (row["backingWriteReqCount"]*(st_row["backingWriteLat_avg_ns"] - row["backingWriteLat_avg_ns"]))/1e9
-                            diff_row["backingReadGain"] = ((row["backingReqCount"]-row["backingWriteReqCount"])*(st_row["backingReadLat_avg_ns"] - row["backingReadLat_avg_ns"]))/1e9
-
-                            diff_row["og-gain"] = diff_row["t2Gain"] + diff_row["backingWriteGain"] + diff_row["backingReadGain"] - diff_row["overhead"]
-
-                            diff_row["st_backingReadSize_avg_byte"] = st_row["backingReadSize_avg_byte"]
-                            diff_row["st_backingWriteSize_avg_byte"] = st_row["backingWriteSize_avg_byte"]
-
-
-                            # the total net latency change due to find and alloc 
-                            # change in mean find and alloc latency 
-                            self.compute_total_latency_from_percentile("allocLat", row)
-
-                            # the total latency change in backing store read latency 
-                            # the total latency change in bacing store write latency 
-
-                            # the total and mean latency difference between T2 hits and ST read miss 
-                            
-
-                            # diff_row["t1_t2"] = row["hmrc1"]
-                            diff_row_list.append(diff_row)
-
-                            # is bandwidth higher? 
-                            # is read and write latency lower? 
-                            if ((diff_row['blockReadSlat_avg_ns'] < 0) and \
-                                    (diff_row['blockWriteSlat_avg_ns'] < 0) and \
-                                    (diff_row['bandwidth_byte/s'] > 0)):
-                                self.mt_opt_count += 1
-                                if row["cacheSizeMB"] >= row["nvmCacheSizeMB"]:
-                                    self.np_mt_opt_count += 1 
-                                mt_opt_hmr_list.append(float(row["hmrc1"]))
-                            else:
-                                self.st_opt_count += 1
-                                st_opt_hmr_list.append(float(row["hmrc1"])) 
-        
-        self._diff_df = pd.DataFrame(diff_row_list)
-
-        if len(self._diff_df) > 0:
-            self._diff_df["machine_id"] = [self._machine_id]* len(self._diff_df)
-            self._diff_df["workload_id"] = [self._workload_id]* len(self._diff_df)
-            self._diff_df["t1_t2_size_ratio"] = self._diff_df["cacheSizeMB"]/self._diff_df["nvmCacheSizeMB"]
-
-            # TODO: check to make sure that there was T2 eviction? 
-            self._diff_df["t1_t2_hr_ratio"] = self._diff_df["t1HitRate"]/self._diff_df["t2HitRate"]
+        for eval_type in EVAL_LIST:
+            self.set_diff_df(DiffEngine(self.get_experiment_set_df(eval_type)).get_diff_df(), eval_type)
+
+
+    def set_diff_df(self, diff_df, eval=None):
+        # set the diff df of an eval type, the experiments where ST or MT cache is better are counted 
+        # using the diff df of the eval type of this DBUnit 
+        if eval is None:
+            eval = self._eval 
+        self._diff_df_map[eval] = diff_df 
+        if eval == self._eval:
+            self._diff_df = diff_df 
+            self.st_opt_count, self.mt_opt_count, self.np_mt_opt_count = get_opt_count(diff_df)
+
+
+    def get_experiment_set_df(self, eval=None):
+        # experiment set df of an eval type with the machine and workload of this DBUnit 
+        if eval is None:
+            eval = self._eval 
+        set_df = self._experiment_set_df_map.get(eval, pd.DataFrame())
+        if set_df.size == 0:
+            return pd.DataFrame()
+        return set_df.assign(machine_id=self._machine_id, workload_id=self._workload_id)
 
             
     def get_size(self):
@@ -260,8 +421,10 @@ class DBUnit:
         # between 
 
     
-    def get_diff_df(self):
-        return self._diff_df
+    def get_diff_df(self, eval=None):
+        if eval is None:
+            return self._diff_df
+        return self._diff_df_map.get(eval, pd.DataFrame())
 
     
     def get_workload_and_machine_id(self):
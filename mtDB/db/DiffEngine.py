@@ -0,0 +1,116 @@
+import pandas as pd
+
+
+# features that identify the machine and workload of an experiment set
+PARTITION_FEATURE_LIST = ["machine_id", "workload_id"]
+
+# features of an experiment set that an MT cache must share with the ST cache it is compared to
+DIFF_KEY_LIST = ["inputQueueSize", "processorThreadCount", "scaleIAT", "cacheSizeMB"]
+
+# metrics of an MT cache where percentage difference doesn't apply and the value of the MT cache is used
+RAW_METRIC_LIST = ["inputQueueSize", "processorThreadCount", "scaleIAT", "cacheSizeMB", "nvmCacheSizeMB",
+                    "t1HitRate", "t2HitRate", "hmrc1", "t2HitCount"]
+
+
+""" This class computes the percentage difference between the statistics
+    of each MT cache and the ST cache with the same tier-1 size from a
+    table of experiment sets of any number of machines and workloads.
+
+    The ST cache of each MT cache is found by a single merge on the
+    machine, workload and DIFF_KEY_LIST and every derived metric is
+    computed on whole columns at once.
+"""
+class DiffEngine:
+    def __init__(self, experiment_set_df):
+        # table of experiment sets with columns in PARTITION_FEATURE_LIST
+        self._experiment_set_df = experiment_set_df
+
+
+    def _get_pair_index(self):
+        # index of each MT cache in the experiment set table and of its ST cache, MT caches
+        # are sorted by machine and workload (in order of appearance) and then by DIFF_KEY_LIST
+        set_df = self._experiment_set_df.reset_index(drop=True)
+        key_list = PARTITION_FEATURE_LIST + DIFF_KEY_LIST
+
+        st_df = set_df[(set_df["cacheSizeMB"]>0) & (set_df["nvmCacheSizeMB"]==0)]
+        st_df = st_df[key_list].drop_duplicates(subset=key_list, keep="first")
+        st_df = st_df.assign(_st_index=st_df.index)
+
+        mt_df = set_df[(set_df["cacheSizeMB"]>0) & (set_df["nvmCacheSizeMB"]>0)]
+        mt_df = mt_df[key_list].assign(_mt_index=mt_df.index)
+        mt_df["_partition"] = mt_df.groupby(PARTITION_FEATURE_LIST, sort=False).ngroup()
+
+        pair_df = mt_df.merge(st_df, on=key_list, how="inner", sort=False)
+        pair_df = pair_df.sort_values(by=["_partition"] + DIFF_KEY_LIST, kind="mergesort")
+        return pair_df["_mt_index"].to_numpy(), pair_df["_st_index"].to_numpy()
+
+
+    def get_diff_df(self):
+        """ Get the percentage difference of every metric between each MT cache and its ST
+            cache along with the metrics of the MT cache in RAW_METRIC_LIST and the derived
+            metrics like the latency overhead and gain due to the tier-2 cache.
+        """
+        if len(self._experiment_set_df) == 0:
+            return pd.DataFrame()
+
+        set_df = self._experiment_set_df.reset_index(drop=True)
+        mt_index, st_index = self._get_pair_index()
+        if len(mt_index) == 0:
+            return pd.DataFrame()
+
+        metric_list = [column_name for column_name in set_df.columns if column_name not in PARTITION_FEATURE_LIST]
+        mt_df = set_df.loc[mt_index, metric_list].reset_index(drop=True)
+        st_df = set_df.loc[st_index, metric_list].reset_index(drop=True)
+
+        # collect percentage difference between every metric
+        diff_df = 100*(mt_df - st_df)/st_df
+
+        # reset some metrics where percentage difference doesn't apply
+        for metric_name in RAW_METRIC_LIST:
+            diff_df[metric_name] = mt_df[metric_name]
+        diff_df["writeIORatio"] = mt_df["backingWriteIORequested_byte"]/mt_df["backingIORequested_byte"]
+        diff_df["writeReqRatio"] = mt_df["blockWriteReqCount"]/mt_df["blockReqCount"]
+
+        # the number of find is the total get request
+        diff_df["findLatIncrease"] = mt_df["t1GetCount"] * (mt_df["findLat_avg_ns"]-st_df["findLat_avg_ns"])/1e9
+
+        # the number of alloc is the total write request + get miss count
+        diff_df["allocLatIncrease"] = mt_df["allocationCount"] * (mt_df["allocLat_avg_ns"]-st_df["allocLat_avg_ns"])/1e9
+        diff_df["loadLatIncrease"] = mt_df["blockReqCount"] * (mt_df["loadDuration_avg_us"] - st_df["loadDuration_avg_us"])*1000/1e9
+
+        diff_df["overhead"] = diff_df["findLatIncrease"] + diff_df["allocLatIncrease"] + diff_df["loadLatIncrease"]
+
+        diff_df["t2Gain"] = ((st_df["backingReadLat_avg_ns"] - (mt_df["t2ReadLat_avg_us"]*1000)) * mt_df["t2HitCount"])/1e9
+        diff_df["backingWriteGain"] = (mt_df["backingWriteReqCount"]*(st_df["backingWriteLat_avg_ns"] - mt_df["backingWriteLat_avg_ns"]))/1e9
+        diff_df["backingReadGain"] = ((mt_df["backingReqCount"]-mt_df["backingWriteReqCount"])*(st_df["backingReadLat_avg_ns"] - mt_df["backingReadLat_avg_ns"]))/1e9
+
+        diff_df["og-gain"] = diff_df["t2Gain"] + diff_df["backingWriteGain"] + diff_df["backingReadGain"] - diff_df["overhead"]
+
+        diff_df["st_backingReadSize_avg_byte"] = st_df["backingReadSize_avg_byte"]
+        diff_df["st_backingWriteSize_avg_byte"] = st_df["backingWriteSize_avg_byte"]
+
+        for feature_name in PARTITION_FEATURE_LIST:
+            diff_df[feature_name] = set_df.loc[mt_index, feature_name].to_numpy()
+        diff_df["t1_t2_size_ratio"] = diff_df["cacheSizeMB"]/diff_df["nvmCacheSizeMB"]
+
+        # TODO: check to make sure that there was T2 eviction?
+        diff_df["t1_t2_hr_ratio"] = diff_df["t1HitRate"]/diff_df["t2HitRate"]
+        return diff_df
+
+
+def get_opt_count(diff_df):
+    """ Get the number of MT caches in a diff table where the ST cache is better (st_opt_count),
+        the MT cache is better (mt_opt_count) and the MT cache is better with a tier-2 cache
+        not larger than the tier-1 cache (np_mt_opt_count). The MT cache is better if the
+        bandwidth is higher and the mean read and write latency is lower.
+    """
+    if len(diff_df) == 0:
+        return 0, 0, 0
+
+    mt_opt_mask = (diff_df["blockReadSlat_avg_ns"] < 0) & \
+                    (diff_df["blockWriteSlat_avg_ns"] < 0) & \
+                    (diff_df["bandwidth_byte/s"] > 0)
+    np_mt_opt_mask = mt_opt_mask & (diff_df["cacheSizeMB"] >= diff_df["nvmCacheSizeMB"])
+
+    mt_opt_count = int(mt_opt_mask.sum())
+    return len(diff_df) - mt_opt_count, mt_opt_count, int(np_mt_opt_mask.sum())
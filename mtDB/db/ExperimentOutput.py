@@ -2,18 +2,40 @@ from multiprocessing.sharedctypes import Value
 import pathlib 
 import numpy as np 
 
+from mtDB.db.TimeSeriesStat import TimeSeriesStat
+from mtDB.db.OutputProbe import OutputProbe
+from mtDB.db.TimeSeriesAligner import TimeSeriesAligner
+
+# attributes loaded from the config and summary stats of an output file that are stored in the output cache 
+CACHED_ATTRIBUTE_LIST = ["stat", "nvm_cache_size_mb", "ram_cache_size_mb", "ram_alloc_size_byte", 
+                            "page_size_byte", "input_queue_size", "processor_thread_count", "iat_scale_factor", 
+                            "tag", "full_output"]
+
+
 """ The class reads an experiment output file and loads the 
-    metrics for analysis. """
+    metrics for analysis. If an OutputCache is provided, the 
+    metrics are loaded from the cache when the file has not 
+    changed since it was last parsed. 
+
+    In lazy mode, only the config and summary stats are loaded 
+    when the class is created. The summary stats are read from the 
+    end of the file, after the last snapshot of the time series, so 
+    the time series section of the file is not read until ts_stat 
+    is accessed. """
 class ExperimentOutput:
-    def __init__(self, experiment_output_path):
+    def __init__(self, experiment_output_path, cache=None, lazy=False):
         self._output_path = pathlib.Path(experiment_output_path)
         self._iteration_count = int(self._output_path.stem.split("_")[-1])
 
         # overall stats
         self.stat = {}
 
-        # time series stats
-        self.ts_stat = {}       
+        # time series stats, None until the time series is loaded 
+        self._ts_stat = None 
+        self._t2_hit_start = -1
+
+        # map of (ST output path, mode, grid step) to the aligner of the ST time series with this time series 
+        self._aligner_map = {}
 
         # cache parameters 
         self.nvm_cache_size_mb = 0 
@@ -23,94 +45,289 @@ class ExperimentOutput:
         self.input_queue_size = 0
         self.processor_thread_count = 0 
         self.iat_scale_factor = 0 
-        self.t2_hit_start = -1
         self.tag = "unknown"
 
         # flag indicating whether the output is complete 
         self.full_output = True
 
         # read the file and load metrics 
-        self._load()
-
-
-    def _load(self):
-        # load the experiment output to the class 
+        self._cache = cache 
+        self._lazy = lazy 
+        if self._cache is None or not self._load_from_cache():
+            self._load(load_ts=not self._lazy)
+            if self._cache is not None:
+                self._cache.save(self._output_path, self._get_cache_data())
+                if self._ts_stat is not None:
+                    self._cache.save(self._output_path, self._get_ts_cache_data(), record_name="ts")
+        
+        if not self._lazy and self._ts_stat is None:
+            self._load_ts()
+
+
+    @property
+    def ts_stat(self):
+        # the time series is loaded on first access in lazy mode 
+        if self._ts_stat is None:
+            self._load_ts()
+        return self._ts_stat
+
+
+    @property
+    def t2_hit_start(self):
+        # the time of the first snapshot with a T2 hit, -1 if there is none 
+        if self._ts_stat is None:
+            self._load_ts()
+        return self._t2_hit_start
+
+
+    def __getstate__(self):
+        # the time series of a lazy output is not pickled, it is loaded again when accessed 
+        state = self.__dict__.copy()
+        if self._lazy:
+            state["_ts_stat"] = None 
+        # aligners hold the time series of other outputs so they are not pickled 
+        state["_aligner_map"] = {}
+        return state 
+
+
+    def get_aligner(self, st_output, mode="index", grid_step=None):
+        # aligner of the time series of an ST output with the time series of this MT output, 
+        # created once per pair so that every comparison of the pair uses the same alignment 
+        aligner_key = (str(st_output._output_path), mode, grid_step)
+        if aligner_key not in self._aligner_map:
+            self._aligner_map[aligner_key] = TimeSeriesAligner(st_output.ts_stat, self.ts_stat, mode=mode, grid_step=grid_step)
+        return self._aligner_map[aligner_key]
+
+
+    def _load_from_cache(self):
+        # load the metrics from the cache if the output file has not changed 
+        data = self._cache.load(self._output_path)
+        if data is None:
+            return False 
+        
+        for attribute_name in CACHED_ATTRIBUTE_LIST:
+            setattr(self, attribute_name, data[attribute_name])
+        return True 
+
+
+    def _get_cache_data(self):
+        # data to be stored in the cache for this output 
+        return {attribute_name: getattr(self, attribute_name) for attribute_name in CACHED_ATTRIBUTE_LIST}
+
+
+    def _get_ts_cache_data(self):
+        # time series data to be stored in the cache for this output 
+        return {"ts_stat": self._ts_stat, "t2_hit_start": self._t2_hit_start}
+
+
+    def _load_ts(self):
+        # load the time series from the cache or the output file 
+        if self._cache is not None:
+            data = self._cache.load(self._output_path, record_name="ts")
+            if data is not None:
+                self._ts_stat = data["ts_stat"]
+                self._t2_hit_start = data["t2_hit_start"]
+                return 
+        
         with open(self._output_path) as f:
-            line = f.readline()
-            while line:
-                line = line.rstrip()
-                split_line = line.split("=")
-                # a JSON string cannot have the '=' character without it being in a string with a quote '"'
-                # in case there is a JSON property with an '=' in it 
-                if len(split_line) == 2 and '"' not in line:
-                    # these are performance metrics from CacheBench with format (*metric_name*=*metric_value*)
-                    metric_name = split_line[0]
-                    self.stat[metric_name] = float(split_line[1]) 
-                elif 'stat:' in line:
-                    # load the snapshot of stats at different points in time 
-                    # line containing snapshot of stat at a specific time starts with stat: 
-                    # then *metric_name*=*metric_value*, *metric_name*=*metric_value* ... 
-                    temp_line = line.replace("stat:", "")
-                    metric_str_list = temp_line.split(",")
-                    stat_snapshot = {}
-                    for metric_str in metric_str_list:
-                        split_metric_str = metric_str.split("=") 
-                        if len(split_metric_str) == 2:
-                            metric_name = split_metric_str[0]
-                            metric_val = int(float(split_metric_str[1]))
-                            stat_snapshot[metric_name] = metric_val
-                    
-                    if "t2HitRate" not in stat_snapshot:
-                        self.full_output = True
-                    else: 
-                        if self.t2_hit_start == -1 and stat_snapshot["t2HitRate"] > 0:
-                            self.t2_hit_start = stat_snapshot["T"]
-                            
-                    self.ts_stat[int(stat_snapshot["T"])] = stat_snapshot
-                else:
-                    # these are configuration parameters stored as JSON string in the output file 
-                    if "nvmCacheSizeMB" in line:
-                        split_line = line.split(":")
-                        self.nvm_cache_size_mb = int(split_line[1].replace(",", ""))
-
-                    if "cacheSizeMB" in line:
-                        split_line = line.split(":")
-                        self.ram_cache_size_mb = int(split_line[1].replace(",", ""))
-                        self.stat["cacheSizeMB"] = self.ram_cache_size_mb
-
-                    if "allocSizes" in line:
-                        self.ram_alloc_size_byte = int(f.readline().rstrip())
-                        self.stat["t1AllocSize"] = self.ram_alloc_size_byte
-
-                    if "pageSizeBytes" in line:
-                        split_line = line.split(":")
-                        self.page_size_byte = int(split_line[1].replace(",", ""))
-                        self.stat["pageSizeBytes"] = self.page_size_byte
-
-                    if "inputQueueSize" in line:
-                        split_line = line.split(":")
-                        self.input_queue_size = int(split_line[1].replace(",", ""))
-                        self.stat["inputQueueSize"] = self.input_queue_size
-
-                    if "processorThreadCount" in line:
-                        split_line = line.split(":")
-                        self.processor_thread_count = int(split_line[1].replace(",", ""))
-                        self.stat["processorThreadCount"] = self.processor_thread_count
-
-                    if "scaleIAT" in line:
-                        split_line = line.split(":")
-                        self.iat_scale_factor = int(split_line[1].replace(",", ""))
-                        self.stat["scaleIAT"] = self.iat_scale_factor 
-                    
-                    if "tag" in line:
-                        split_line = line.split(":")
-                        self.tag = split_line[1].replace(",", "")
-
-                line = f.readline()
+            stat_line_list, _ = self._split_snapshot_lines(f.read().splitlines())
+        self._set_ts_stat(stat_line_list)
+
+        if self._cache is not None:
+            self._cache.save(self._output_path, self._get_ts_cache_data(), record_name="ts")
+
+
+    def _set_ts_stat(self, stat_line_list):
+        # create the time series from the snapshot lines in the order they appear in the file 
+        time_array, metric_map = self._parse_snapshot_list(stat_line_list)
+        self._t2_hit_start = -1
+        if "t2HitRate" in metric_map:
+            t2_hit_index = np.flatnonzero(metric_map["t2HitRate"] > 0)
+            if len(t2_hit_index) > 0:
+                self._t2_hit_start = int(time_array[t2_hit_index[0]])
+        self._ts_stat = TimeSeriesStat(time_array, metric_map)
+
+
+    def _is_stat_line(self, line):
+        # these are performance metrics from CacheBench with format (*metric_name*=*metric_value*)
+        # a JSON string cannot have the '=' character without it being in a string with a quote '"'
+        # in case there is a JSON property with an '=' in it 
+        return line.count("=") == 1 and '"' not in line
+
+
+    def _split_snapshot_lines(self, line_list):
+        # separate the snapshot lines from the rest in bulk, same as the checks in _parse_lines 
+        # a line with 'stat:' is a summary stat and not a snapshot if it has a single '=' and no '"'
+        stat_line_list = [line for line in line_list if 'stat:' in line and (line.count("=") != 1 or '"' in line)]
+        other_line_list = [line for line in line_list if 'stat:' not in line or (line.count("=") == 1 and '"' not in line)]
+        return stat_line_list, other_line_list
+
+
+    def _parse_snapshot(self, line):
+        # load the snapshot of stats at different points in time 
+        # line containing snapshot of stat at a specific time starts with stat: 
+        # then *metric_name*=*metric_value*, *metric_name*=*metric_value* ... 
+        temp_line = line.replace("stat:", "")
+        metric_str_list = temp_line.split(",")
+        stat_snapshot = {}
+        for metric_str in metric_str_list:
+            split_metric_str = metric_str.split("=") 
+            if len(split_metric_str) == 2:
+                metric_name = split_metric_str[0]
+                stat_snapshot[metric_name] = split_metric_str[1]
+        return stat_snapshot
+
+
+    def _parse_snapshot_list(self, stat_line_list):
+        """ Convert the snapshot lines to an array of times and an array of values per metric 
+            in the order the lines appear in the file. Lines with the same sequence of metric names 
+            are grouped and all values of a group are converted to numbers in a single call. A value 
+            is NaN if the metric is missing from a snapshot. 
+        """
+        if len(stat_line_list) == 0:
+            return np.empty(0, dtype=np.int64), {}
+
+        # usually every line has the same sequence of metric names so all lines are split at once 
+        # and the names in each line are compared to the names in the first line 
+        metric_name_list = stat_line_list[0].replace("stat:", "").replace("=", ",").split(",")[0::2]
+        token_list = ",".join(stat_line_list).replace("stat:", "").replace("=", ",").split(",")
+        if len(token_list) == 2 * len(stat_line_list) * len(metric_name_list) and \
+                len(set(metric_name_list)) == len(metric_name_list):
+            if token_list[0::2] == metric_name_list * len(stat_line_list):
+                # the values are stored as integers in the time series 
+                value_array = np.trunc(np.array(token_list[1::2], dtype=np.float64))
+                value_array = value_array.reshape(len(stat_line_list), len(metric_name_list))
+                metric_map = {metric_name: value_array[:, metric_index] for metric_index, metric_name in enumerate(metric_name_list)}
+                if "T" not in metric_map:
+                    raise ValueError("Snapshot without time T in file {}".format(self._output_path))
+                time_array = metric_map.pop("T")
+                return time_array.astype(np.int64), metric_map
+
+        # map of tuple of metric names -> list of line index and list of value strings 
+        group_map = {}
+        for line_index, line in enumerate(stat_line_list):
+            temp_line = line.replace("stat:", "")
+            if temp_line.count("=") == temp_line.count(",") + 1:
+                split_line = temp_line.replace("=", ",").split(",")
+                metric_name_tuple = tuple(split_line[0::2])
+                value_str_list = split_line[1::2]
+            else:
+                # some metric strings in the line do not have the format *metric_name*=*metric_value*
+                stat_snapshot = self._parse_snapshot(line)
+                metric_name_tuple = tuple(stat_snapshot.keys())
+                value_str_list = list(stat_snapshot.values())
             
-            self.stat["nvmCacheSizeMB"] = self.nvm_cache_size_mb
-            if self.input_queue_size == 0 or self.iat_scale_factor == 0 or self.processor_thread_count == 0:
-                raise ValueError("Some cache parameter missing from file {}".format(self._output_path))
+            if len(set(metric_name_tuple)) != len(metric_name_tuple):
+                # the last value of a repeated metric name is used 
+                stat_snapshot = dict(zip(metric_name_tuple, value_str_list))
+                metric_name_tuple = tuple(stat_snapshot.keys())
+                value_str_list = list(stat_snapshot.values())
+
+            if metric_name_tuple not in group_map:
+                group_map[metric_name_tuple] = [[], []]
+            group_map[metric_name_tuple][0].append(line_index)
+            group_map[metric_name_tuple][1] += value_str_list
+
+        metric_map = {}
+        for metric_name_tuple, (line_index_list, value_str_list) in group_map.items():
+            # the values are stored as integers in the time series 
+            value_array = np.trunc(np.array(value_str_list, dtype=np.float64))
+            value_array = value_array.reshape(len(line_index_list), len(metric_name_tuple))
+            for metric_index, metric_name in enumerate(metric_name_tuple):
+                if metric_name not in metric_map:
+                    metric_map[metric_name] = np.full(len(stat_line_list), np.nan)
+                metric_map[metric_name][line_index_list] = value_array[:, metric_index]
+        
+        time_array = metric_map.pop("T", np.full(len(stat_line_list), np.nan))
+        if np.isnan(time_array).any():
+            raise ValueError("Snapshot without time T in file {}".format(self._output_path))
+        return time_array.astype(np.int64), metric_map
+
+
+    def _parse_config_line(self, line, line_iter):
+        # these are configuration parameters stored as JSON string in the output file 
+        if "nvmCacheSizeMB" in line:
+            split_line = line.split(":")
+            self.nvm_cache_size_mb = int(split_line[1].replace(",", ""))
+
+        if "cacheSizeMB" in line:
+            split_line = line.split(":")
+            self.ram_cache_size_mb = int(split_line[1].replace(",", ""))
+            self.stat["cacheSizeMB"] = self.ram_cache_size_mb
+
+        if "allocSizes" in line:
+            self.ram_alloc_size_byte = int(next(line_iter).rstrip())
+            self.stat["t1AllocSize"] = self.ram_alloc_size_byte
+
+        if "pageSizeBytes" in line:
+            split_line = line.split(":")
+            self.page_size_byte = int(split_line[1].replace(",", ""))
+            self.stat["pageSizeBytes"] = self.page_size_byte
+
+        if "inputQueueSize" in line:
+            split_line = line.split(":")
+            self.input_queue_size = int(split_line[1].replace(",", ""))
+            self.stat["inputQueueSize"] = self.input_queue_size
+
+        if "processorThreadCount" in line:
+            split_line = line.split(":")
+            self.processor_thread_count = int(split_line[1].replace(",", ""))
+            self.stat["processorThreadCount"] = self.processor_thread_count
+
+        if "scaleIAT" in line:
+            split_line = line.split(":")
+            self.iat_scale_factor = int(split_line[1].replace(",", ""))
+            self.stat["scaleIAT"] = self.iat_scale_factor 
+        
+        if "tag" in line:
+            split_line = line.split(":")
+            self.tag = split_line[1].replace(",", "")
+
+
+    def _parse_lines(self, line_iter, stat_line_list):
+        """ Load the config and stats from an iterator of lines. Each line is classified once as a 
+            summary stat, a snapshot of the time series or a config line. The snapshot lines are 
+            added to stat_line_list to be converted together. If stat_line_list is None, the function 
+            returns True when it reaches the first snapshot, otherwise it returns False once all 
+            lines are read. 
+        """
+        for line in line_iter:
+            line = line.rstrip()
+            if self._is_stat_line(line):
+                metric_name, metric_value = line.split("=")
+                self.stat[metric_name] = float(metric_value) 
+            elif 'stat:' in line:
+                if stat_line_list is None:
+                    return True 
+                stat_line_list.append(line)
+            else:
+                self._parse_config_line(line, line_iter)
+        return False 
+
+
+    def _load(self, load_ts=True):
+        # load the experiment output to the class 
+        if load_ts:
+            # read the whole file in one buffer and parse the snapshots together 
+            with open(self._output_path) as f:
+                stat_line_list, other_line_list = self._split_snapshot_lines(f.read().splitlines())
+            self._parse_lines(iter(other_line_list), [])
+            self._set_ts_stat(stat_line_list)
+        else:
+            with open(self._output_path) as f:
+                reached_ts = self._parse_lines(f, None)
+                if reached_ts:
+                    # skip the time series and load the summary stats that follow the last snapshot 
+                    summary_line_list = OutputProbe(self._output_path).get_summary_lines()
+                    if summary_line_list is not None:
+                        self._parse_lines(iter(summary_line_list), None)
+                    else:
+                        # the last snapshot was not found near the end of the file so read the rest of it 
+                        self._parse_lines(f, [])
+
+        self.stat["nvmCacheSizeMB"] = self.nvm_cache_size_mb
+        if self.input_queue_size == 0 or self.iat_scale_factor == 0 or self.processor_thread_count == 0:
+            raise ValueError("Some cache parameter missing from file {}".format(self._output_path))
 
         # does the output have all the performance stats? Is it complete? 
         if self.is_output_complete():
@@ -118,16 +335,32 @@ class ExperimentOutput:
             self.stat["t2HitCount"] = self.get_t2_hit_count()
 
 
+    def at_T(self, T, metric_name, mode="nearest"):
+        # value of a time series metric at T (single value or array) that need not be the time 
+        # of a snapshot, mode is one of "nearest", "floor" or "linear" (see TimeSeriesStat.at)
+        return self.ts_stat.at(T, metric_name, mode=mode)
+
+
+    def between_T(self, start_T, end_T, metric_name, mode="nearest"):
+        # change in a time series metric between start_T and end_T 
+        return self.ts_stat.between(start_T, end_T, metric_name, mode=mode)
+
+
+    def get_bytes_at_T(self, T, mode="nearest"):
+        # bytes processed (read and write) at T that need not be the time of a snapshot 
+        return self.at_T(T, "readIOProcessed", mode=mode) + self.at_T(T, "writeIOProcessed", mode=mode)
+
+
     def get_bytes_processed_at_T(self, T):
-        return self.ts_stat[T]["readIOProcessed"] + self.ts_stat[T]["writeIOProcessed"]
+        return self.get_read_io_processed_at_T(T) + self.get_write_io_processed_at_T(T)
 
 
     def get_read_io_processed_at_T(self, T):
-        return self.ts_stat[T]["readIOProcessed"]
+        return self.ts_stat.get_series("readIOProcessed")[self.ts_stat.get_index(T)]
 
 
     def get_write_io_processed_at_T(self, T):
-        return self.ts_stat[T]["writeIOProcessed"]
+        return self.ts_stat.get_series("writeIOProcessed")[self.ts_stat.get_index(T)]
 
 
     
@@ -140,11 +373,11 @@ class ExperimentOutput:
 
     
     def get_read_io_processed(self):
-        return self.ts_stat[max(self.ts_stat.keys())]["readIOProcessed"]
+        return self.ts_stat.get_series("readIOProcessed")[-1]
 
 
     def get_write_io_processed(self):
-        return self.ts_stat[max(self.ts_stat.keys())]["writeIOProcessed"]
+        return self.ts_stat.get_series("writeIOProcessed")[-1]
     
 
     def get_ts_bandwidth(self):
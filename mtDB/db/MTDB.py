@@ -1,43 +1,257 @@
 import pathlib 
+import json
 import itertools
+import multiprocessing
 from platform import machine
+import pandas as pd
 
 import matplotlib.pyplot as plt
 
-from mtDB.db.ExperimentOutput import ExperimentOutput
 plt.rcParams.update({'font.size': 25})
 
-from mtDB.db.DBUnit import DBUnit
+from mtDB.db.DBUnit import DBUnit, load_complete_output, EVAL_LIST
+from mtDB.db.OutputCache import OutputCache
+from mtDB.db.OutputIndex import OutputIndex, normalize_filters
+from mtDB.db.Manifest import Manifest
+from mtDB.db.Warehouse import Warehouse
+from mtDB.db.DiffEngine import DiffEngine, PARTITION_FEATURE_LIST
+from mtDB.db.ConfigCube import ConfigCube
+from mtDB.db.PlotPool import PlotPool
+from mtDB.db.PlotManifest import PlotManifest, get_input_fingerprint
 
 
 class MTDB:
-    def __init__(self, data_dir, eval="mean"):
+    def __init__(self, data_dir, eval="mean", cache_dir=None, lazy=True, filters=None, workers=1, stream=False):
         self.data_dir = pathlib.Path(data_dir)
         self.eval = eval
 
-        # list of DBUnit objects
+        # index of output files built from the directory listing, only the output files that 
+        # match the filters are loaded (see normalize_filters in OutputIndex for the format of filters)
+        # e.g. {"machine_id": "c220g1", "workload_id": "w82", "scaleIAT": 100}
+        self.index = OutputIndex(self.data_dir)
+        self.filters = filters 
+
+        # number of worker processes used to parse output files 
+        self.workers = workers 
+
+        # only load the config and summary stats of output files, time series are loaded on first access 
+        self.lazy = lazy 
+
+        # cache of parsed output files, output files are parsed on every load if no cache dir is specified 
+        # the manifest of DBUnits is also stored in the cache dir so that a DBUnit is only built again 
+        # when the output files in its directory change 
+        self.cache = None 
+        self.manifest = None 
+        if cache_dir is not None:
+            self.cache = OutputCache(cache_dir)
+            self.manifest = Manifest(pathlib.Path(cache_dir).joinpath("manifest"))
+
+        # in stream mode, DBUnits are not loaded when MTDB is created, each DBUnit is loaded when 
+        # it is needed by iter_units() and released after use so only one DBUnit is in memory at a time 
+        self.stream = stream 
+
+        # list of DBUnit objects, it is empty in stream mode 
         # DBUnit represents a directory containing experiment outputs 
         self.unit_list = []
-        self._load_data()
+        if not self.stream:
+            self._load_data()
 
 
     def _load_data(self):
-        # load all files inside the data directory 
-        # create a single DBUnit per dir that contain data files 
-        db_unit_path_list = []
-        for data_file_path in self.data_dir.rglob("*"):
-            if data_file_path.is_file():
-                # each directory containing any of the output files is a DBUnit 
-                db_unit_path = data_file_path.parent
+        # create a single DBUnit per dir that contain output files matching the filters 
+        self.unit_list = self._load_units(self.index.get_unit_map(self.filters), self.filters)
+
+
+    def _load_units(self, unit_map, filters=None, get_pool=None):
+        # get the list of DBUnits with some valid points from a map of dir to the output files to load 
+        # restore the DBUnits of directories whose output files have not changed from the manifest 
+        # a DBUnit of a directory where output files were only added is restored and the new output 
+        # files are added to it, the filters used to select the output files in unit_map are part of the 
+        # settings of the DBUnits in the manifest 
+        setting_map = self._get_setting_map(filters)
+        fingerprint_map, restored_unit_map, grown_unit_map = {}, {}, {}
+        if self.manifest is not None:
+            for db_unit_path, output_path_list in unit_map.items():
+                fingerprint = self.manifest.get_fingerprint(output_path_list)
+                fingerprint_map[db_unit_path] = fingerprint
+                db_unit = self.manifest.load(db_unit_path, fingerprint, setting_map)
+                if db_unit is not None:
+                    restored_unit_map[db_unit_path] = db_unit 
+                    continue 
+
+                previous_fingerprint, db_unit = self.manifest.load_previous(db_unit_path, setting_map)
+                if db_unit is not None and set(previous_fingerprint).issubset(fingerprint):
+                    new_output_path_list = [output_path for output_path, file_fingerprint in zip(output_path_list, fingerprint) \
+                                                if file_fingerprint not in previous_fingerprint]
+                    grown_unit_map[db_unit_path] = (db_unit, new_output_path_list)
+
+        # only the output files of directories not restored from the manifest and new output files are loaded 
+        loaded_output_map = {}
+        if self.workers > 1:
+            load_unit_map = {}
+            for db_unit_path in unit_map:
+                if db_unit_path in grown_unit_map:
+                    load_unit_map[db_unit_path] = grown_unit_map[db_unit_path][1]
+                elif db_unit_path not in restored_unit_map:
+                    load_unit_map[db_unit_path] = unit_map[db_unit_path]
+
+            # no pool is needed if every DBUnit was restored from the manifest 
+            if any([len(output_path_list) > 0 for output_path_list in load_unit_map.values()]):
+                loaded_output_map = self._load_outputs_parallel(load_unit_map, None if get_pool is None else get_pool())
+
+        db_unit_list, stale_unit_list = [], []
+        for db_unit_path, output_path_list in unit_map.items():
+            if db_unit_path in restored_unit_map:
+                db_unit = restored_unit_map[db_unit_path]
+            elif db_unit_path in grown_unit_map:
+                db_unit, new_output_path_list = grown_unit_map[db_unit_path]
+                loaded_output_list = None 
+                if self.workers > 1:
+                    loaded_output_list = [loaded_output_map[output_path] for output_path in new_output_path_list]
+                db_unit.add_outputs(new_output_path_list, loaded_output_list=loaded_output_list, run_analysis=False)
+                stale_unit_list.append((db_unit_path, db_unit))
+            else:
                 workload_id, machine_id = self._get_id(db_unit_path)
-                # check if the DBUnit for the current directory being evaluated has 
-                # already been created 
-                if str(db_unit_path) not in db_unit_path_list:
-                    db_unit_path_list.append(str(db_unit_path))
-                    db_unit = DBUnit(db_unit_path, machine_id, workload_id, self.eval)
-                    # store the DBUnit only if it has some valid points 
-                    if db_unit.get_size() > 0:
-                        self.unit_list.append(db_unit)
+                loaded_output_list = None 
+                if self.workers > 1:
+                    loaded_output_list = [loaded_output_map[output_path] for output_path in output_path_list]
+
+                db_unit = DBUnit(db_unit_path, machine_id, workload_id, self.eval, 
+                                    cache=self.cache, lazy=self.lazy, output_path_list=output_path_list,
+                                    loaded_output_list=loaded_output_list, run_analysis=False)
+                stale_unit_list.append((db_unit_path, db_unit))
+            db_unit_list.append(db_unit)
+
+        # compare MT and ST caches of all new and updated DBUnits at once 
+        self._run_mt_analysis([db_unit for _, db_unit in stale_unit_list])
+        if self.manifest is not None:
+            for db_unit_path, db_unit in stale_unit_list:
+                self.manifest.save(db_unit_path, fingerprint_map[db_unit_path], setting_map, db_unit)
+
+        # store the DBUnit only if it has some valid points 
+        return [db_unit for db_unit in db_unit_list if db_unit.get_size() > 0]
+
+
+    def iter_units(self, filters=None):
+        """ Yield DBUnits one at a time. If MTDB is not in stream mode and there are no filters, 
+            the DBUnits that are already loaded are yielded. Otherwise, each DBUnit is loaded 
+            from the output files that match both the filters of MTDB and the filters specified 
+            and it is released before the next DBUnit is loaded. 
+        """
+        if not self.stream and filters is None:
+            for db_unit in self.unit_list:
+                yield db_unit 
+            return 
+
+        merged_filters = self._merge_filters(self.filters, filters)
+        yield from self._iter_loaded_units(self.index.get_unit_map(merged_filters), merged_filters)
+
+
+    def _iter_loaded_units(self, unit_map, filters=None):
+        # load and yield the DBUnit of each dir in a map of dir to output files selected by the filters one at a time 
+        # the output files of every DBUnit are parsed by the same pool, which is created the first time it is needed 
+        pool_list = []
+        def get_pool():
+            if len(pool_list) == 0:
+                pool_list.append(multiprocessing.Pool(self.workers))
+            return pool_list[0]
+
+        try:
+            for db_unit_path, output_path_list in unit_map.items():
+                # the DBUnit is removed from the list when it is yielded so that it is released after use 
+                db_unit_list = self._load_units({db_unit_path: output_path_list}, filters, get_pool)
+                while len(db_unit_list) > 0:
+                    yield db_unit_list.pop(0)
+        finally:
+            for pool in pool_list:
+                pool.close()
+                pool.join()
+
+
+    def _iter_planned_units(self, unit_map):
+        # yield the DBUnits of the directories in a map of dir to output files (from self.index), the 
+        # DBUnits that are already loaded are used if MTDB is not in stream mode 
+        if not self.stream:
+            unit_id_set = set([self._get_id(db_unit_path) for db_unit_path in unit_map])
+            for db_unit in self.unit_list:
+                if db_unit.get_workload_and_machine_id() in unit_id_set:
+                    yield db_unit 
+            return 
+
+        yield from self._iter_loaded_units(unit_map, self.filters)
+
+
+    def _merge_filters(self, filters, other_filters):
+        # filters that select output files that match both filters 
+        if filters is None:
+            return other_filters 
+        if other_filters is None:
+            return filters 
+
+        merged_filters = normalize_filters(filters)
+        for feature_name, value_list in normalize_filters(other_filters).items():
+            if feature_name in merged_filters:
+                value_list = [value for value in value_list if value in merged_filters[feature_name]]
+            merged_filters[feature_name] = value_list 
+        return merged_filters 
+
+
+    def _run_mt_analysis(self, db_unit_list):
+        # compute the diff df of the experiment sets of multiple DBUnits in a single pass per eval type 
+        for eval_type in EVAL_LIST:
+            set_df_list = [db_unit.get_experiment_set_df(eval_type) for db_unit in db_unit_list if db_unit.get_size() > 0]
+            diff_df = pd.DataFrame()
+            if len(set_df_list) > 0:
+                diff_df = DiffEngine(pd.concat(set_df_list, ignore_index=True)).get_diff_df()
+
+            diff_df_map = {}
+            if len(diff_df) > 0:
+                for (machine_id, workload_id), unit_diff_df in diff_df.groupby(PARTITION_FEATURE_LIST, sort=False):
+                    diff_df_map[(machine_id, workload_id)] = unit_diff_df.reset_index(drop=True)
+
+            for db_unit in db_unit_list:
+                workload_id, machine_id = db_unit.get_workload_and_machine_id()
+                db_unit.set_diff_df(diff_df_map.get((machine_id, workload_id), pd.DataFrame()), eval_type)
+
+
+    def _get_setting_map(self, filters=None):
+        # settings that change how a DBUnit is built from the output files, filters on the features in 
+        # PARTITION_FEATURE_LIST select whole directories so only the other filters change a DBUnit 
+        setting_map = {"eval": self.eval, "lazy": self.lazy}
+        unit_filter_list = self._get_filter_list(filters, PARTITION_FEATURE_LIST)
+        if len(unit_filter_list) > 0:
+            setting_map["filters"] = unit_filter_list
+        return setting_map
+
+
+    def _get_filter_list(self, filters, skip_feature_list=[]):
+        # sorted list of each filtered feature and its sorted values, used to key the records of 
+        # loads and plots that depend on the filters, features in skip_feature_list are left out 
+        return sorted([(feature_name, sorted(value_list, key=str)) for feature_name, value_list in (normalize_filters(filters) or {}).items() \
+                            if feature_name not in skip_feature_list])
+
+
+    def _get_plot_key(self, plot_name, filters, skip_feature_list=[]):
+        # key of a set of plots in a plot manifest, plots made with different filters have different keys 
+        # so that plotting a subset of the data does not overwrite the records of other plots 
+        filter_list = self._get_filter_list(filters, skip_feature_list)
+        if len(filter_list) == 0:
+            return "{}_{}".format(self.eval, plot_name)
+        return "{}_{}_{}".format(self.eval, plot_name, json.dumps(filter_list, default=str))
+
+
+    def _load_outputs_parallel(self, unit_map, pool=None):
+        # parse all output files using a pool of worker processes (a new pool if none is specified), each worker gets 
+        # chunks of files and the outputs are returned in the same order as the files so DBUnit indices do not change 
+        output_path_list = [output_path for db_unit_path in unit_map for output_path in unit_map[db_unit_path]]
+        arg_list = [(output_path, self.cache, self.lazy) for output_path in output_path_list]
+        chunk_size = max(1, len(arg_list)//(4*self.workers))
+        if pool is not None:
+            loaded_output_list = pool.starmap(load_complete_output, arg_list, chunksize=chunk_size)
+        else:
+            with multiprocessing.Pool(self.workers) as pool:
+                loaded_output_list = pool.starmap(load_complete_output, arg_list, chunksize=chunk_size)
+        return dict(zip(output_path_list, loaded_output_list))
 
 
     def _get_id(self, db_unit_path):    
@@ -45,7 +259,10 @@ class MTDB:
         return db_unit_path.name , db_unit_path.parent.name
 
 
-    def plot_ts(self, metric_list, output_dir):
+    def plot_ts(self, metric_list, output_dir, multi_panel=False):
+        # plot the time series of each metric of each pair of ST and MT output, if multi_panel 
+        # is True, the metrics of a pair are plotted in a single figure with a panel per metric, 
+        # returns the summary of the plots rendered (see PlotPool.run) 
         # only support "best" and "mean" (mean needs to be checked)
         if self.eval != "best" and self.eval != "mean":
             raise ValueError("No support for other eval type {}".format(self.eval))
@@ -67,195 +284,156 @@ class MTDB:
             "backingWriteLat_p99_ns": "p99 backing store write latency (ns)"
         }
 
-        # iterate through each metric
-        for metric_name in metric_list:
-            # iterate through each DB unit in the database 
-            for db_unit in self.unit_list:
-                workload_id, machine_id = db_unit.get_workload_and_machine_id()
-                # iterate through each pair of ST, MT cache in the DBUnit 
-                st_mt_pairs = db_unit.get_st_mt_pairs()
-                for st_mt_pair in st_mt_pairs:
-                    st_row = st_mt_pair[0]
-                    mt_row = st_mt_pair[1]
-
-                    st_output = db_unit.output_list[int(st_row["index"])]
-                    mt_output = db_unit.output_list[int(mt_row["index"])]
-
-                    st_time_list = []
-                    mt_time_list = []
-
-                    st_metric_list = []
-                    mt_metric_list = []
-
-                    x_len = min(len(st_output.ts_stat.keys()), len(mt_output.ts_stat.keys()))
-
-                    sorted_st_time = sorted(st_output.ts_stat.keys())
-                    sorted_mt_time = sorted(mt_output.ts_stat.keys())
-                    for index in range(x_len):
-                        st_cur_time = sorted_st_time[index]
-                        mt_cur_time = sorted_mt_time[index]
-                        st_time_list.append(st_cur_time)
-                        mt_time_list.append(mt_cur_time)
-                        if metric_name == "overallBandwidth":
-                            st_metric_list.append(st_output.ts_stat[st_cur_time][metric_name]/(1024*1024))
-                            mt_metric_list.append(mt_output.ts_stat[mt_cur_time][metric_name]/(1024*1024))
-                        else:
-                            st_metric_list.append(st_output.ts_stat[st_cur_time][metric_name])
-                            mt_metric_list.append(mt_output.ts_stat[mt_cur_time][metric_name])
-
-                    
-                    # output dir will be output dir/*machine_id*/*workload_id*
-                    plot_output_dir = output_dir.joinpath(machine_id, workload_id)
-                    plot_output_dir.mkdir(parents=True, exist_ok=True)
-
-                    mt_opt_flag = 0 
-                    if mt_output.stat["bandwidth_byte/s"] > st_output.stat["bandwidth_byte/s"]:
-                        mt_opt_flag = 1
+        # plan: the plots of a metric ("all" for multi-panel plots) in the directory of a DBUnit are 
+        # recorded in its plot manifest with the fingerprint of the output files of the DBUnit and the 
+        # filters, a DBUnit is only loaded if some of its plots are missing or were made from output 
+        # files that changed 
+        plot_name_list = ["all"] if multi_panel else metric_list
+        plan_map = {}
+        for db_unit_path, output_path_list in self.index.get_unit_map(self.filters).items():
+            workload_id, machine_id = self._get_id(db_unit_path)
+            plot_manifest = PlotManifest(output_dir.joinpath(machine_id, workload_id))
+            file_fingerprint = Manifest.get_fingerprint(output_path_list)
+            fingerprint_map = {}
+            for plot_name in plot_name_list:
+                plot_key = self._get_plot_key(plot_name, self.filters, PARTITION_FEATURE_LIST)
+                fingerprint = get_input_fingerprint(file_fingerprint, self.eval, 
+                                                        metric_list if multi_panel else plot_name)
+                if not plot_manifest.is_current(plot_key, fingerprint):
+                    fingerprint_map[plot_key] = fingerprint 
+
+            if len(fingerprint_map) > 0:
+                plan_map[db_unit_path] = (output_path_list, plot_manifest, fingerprint_map)
+
+        # plots are queued and rendered by a pool of self.workers processes after every pair is aligned 
+        plot_pool = PlotPool(self.workers)
+        file_list_map = {db_unit_path: {} for db_unit_path in plan_map}
+        file_record_list = []
+
+        # iterate through each DB unit with missing or stale plots, in stream mode only one DBUnit is loaded at a time 
+        unit_path_map = {self._get_id(db_unit_path): db_unit_path for db_unit_path in plan_map}
+        for db_unit in self._iter_planned_units({db_unit_path: plan_map[db_unit_path][0] for db_unit_path in plan_map}):
+            workload_id, machine_id = db_unit.get_workload_and_machine_id()
+            db_unit_path = unit_path_map[(workload_id, machine_id)]
+            _, plot_manifest, fingerprint_map = plan_map[db_unit_path]
+
+            # output dir will be output dir/*machine_id*/*workload_id*
+            plot_output_dir = output_dir.joinpath(machine_id, workload_id)
+            plot_output_dir.mkdir(parents=True, exist_ok=True)
+
+            # iterate through each pair of ST, MT cache in the DBUnit, the pair is aligned 
+            # once and the plot of every metric is made from the same alignment 
+            for st_row, mt_row in db_unit.get_st_mt_pairs():
+                st_output = db_unit.output_list[int(st_row["index"])]
+                mt_output = db_unit.output_list[int(mt_row["index"])]
+                pair_fingerprint = Manifest.get_fingerprint(db_unit.get_output_files_per_row(st_row) + \
+                                                                db_unit.get_output_files_per_row(mt_row))
+
+                mt_opt_flag = 0 
+                if mt_output.stat["bandwidth_byte/s"] > st_output.stat["bandwidth_byte/s"]:
+                    mt_opt_flag = 1
+
+                # output file name will have format 
+                # *queue_size*_*thread_count*_*iat_scale*_*t1_size*_*t2_size*_*eval_type*_*metric_name*.png
+                # where the metric name is "all" for a multi-panel plot of every metric 
+                # each plot file is also recorded with the fingerprint of the output files of its pair under 
+                # its name without the flag, so a plot is made again only if its own inputs changed and the 
+                # only file removed is the plot of the same pair and metric with the other flag 
+                output_path_map = {}
+                for plot_name in plot_name_list:
+                    plot_key = self._get_plot_key(plot_name, self.filters, PARTITION_FEATURE_LIST)
+                    if plot_key not in fingerprint_map:
+                        continue 
 
-                    # output file name will have format 
-                    # *queue_size*_*thread_count*_*iat_scale*_*t1_size*_*t2_size*_*eval_type*_*metric_name*.png
-                    output_file_name = "{}_{}_{}_{}_{}_{}_{}_{}.png".format(
+                    file_key = "{}_{}_{}_{}_{}_{}_{}".format(
                         int(mt_row["inputQueueSize"]),
                         int(mt_row["processorThreadCount"]),
                         int(mt_row["scaleIAT"]),
                         int(mt_row["cacheSizeMB"]),
                         int(mt_row["nvmCacheSizeMB"]),
                         self.eval,
-                        metric_name,
-                        mt_opt_flag
+                        plot_name
                     )
+                    output_file_name = "{}_{}.png".format(file_key, mt_opt_flag)
                     output_path = plot_output_dir.joinpath(output_file_name)
-                    
-                    if not output_path.exists():
-                        _, ax = plt.subplots(figsize=[14, 10])
-                        ax.plot(st_time_list, st_metric_list, "-*", markersize=10, label="ST")
-                        ax.plot(mt_time_list, mt_metric_list, "-^", markersize=10, label="MT")
-                        ax.set_xlabel("Time Elasped (sec)")
-                        ax.set_ylabel("{}".format(y_label_map[metric_name]))
-                        plt.legend()
-                        plt.tight_layout()
-                        plt.savefig(output_path)
-                        plt.close()
-                        print("Plot done: {}".format(output_path))
+                    file_list_map[db_unit_path].setdefault(plot_key, []).append(output_file_name)
+
+                    file_fingerprint = get_input_fingerprint(pair_fingerprint, self.eval, 
+                                                                metric_list if multi_panel else plot_name)
+                    file_record_list.append((plot_manifest, file_key, file_fingerprint, output_file_name))
+                    if not plot_manifest.is_current(file_key, file_fingerprint) or not output_path.exists():
+                        output_path_map[plot_name] = output_path 
+
+                # the time series is not loaded if every plot of the pair exists 
+                if len(output_path_map) == 0:
+                    continue 
+
+                # compare the snapshots with the same index, the time of snapshots at the same 
+                # index is not always equal in ST and MT (e.g. 60 in ST and 61 in MT)
+                aligner = mt_output.get_aligner(st_output, mode="index")
+
+                if multi_panel:
+                    panel_list = [self._get_ts_panel(aligner, metric_name, y_label_map[metric_name], None) \
+                                    for metric_name in metric_list]
+                    panel_list[-1]["x_label"] = "Time Elasped (sec)"
+                    plot_pool.add(output_path_map["all"], panel_list, figsize=[14, 5*len(metric_list)])
+                else:
+                    for metric_name, output_path in output_path_map.items():
+                        plot_pool.add(output_path, [self._get_ts_panel(aligner, metric_name, y_label_map[metric_name], 
+                                                                        "Time Elasped (sec)")])
+
+        summary = plot_pool.run()
+
+        # the plot manifests are updated after the plots are rendered, a DBUnit without valid points has no plots, 
+        # files are only removed through the records of the plot files that were made again 
+        for plot_manifest, file_key, file_fingerprint, output_file_name in file_record_list:
+            plot_manifest.update(file_key, file_fingerprint, [output_file_name])
+        for db_unit_path, (_, plot_manifest, fingerprint_map) in plan_map.items():
+            for plot_key, fingerprint in fingerprint_map.items():
+                plot_manifest.update(plot_key, fingerprint, file_list_map[db_unit_path].get(plot_key, []), remove_stale=False)
+            plot_manifest.save()
+        return summary 
+
+
+    def _get_ts_panel(self, aligner, metric_name, y_label, x_label):
+        # plot panel of the aligned ST and MT time series of a metric 
+        st_metric_list, mt_metric_list = aligner.get_series(metric_name)
+        if metric_name == "overallBandwidth":
+            st_metric_list = st_metric_list/(1024*1024)
+            mt_metric_list = mt_metric_list/(1024*1024)
+
+        return PlotPool.get_line_panel([(aligner.st_T, st_metric_list, "-*", "ST"), 
+                                            (aligner.mt_T, mt_metric_list, "-^", "MT")], x_label, y_label)
     
 
-    def addToMap(self, list_map, machine_id, workload_id, config_id, value):
-        if machine_id in list_map:
-            if workload_id in list_map[machine_id]:
-                if config_id in list_map[machine_id][workload_id]:
-                    list_map[machine_id][workload_id][config_id].append(value)
-                else:
-                    list_map[machine_id][workload_id][config_id] = [value]
-            else:
-                list_map[machine_id][workload_id] = {
-                    config_id: [value]
-                }
-        else:
-            list_map[machine_id] = {
-                workload_id: {
-                    config_id: [value]
-                }
-            }
-
-
-    def get_list_from_map_groups(self, list_map, grouping_features):
-        # go through each item of map 
-        # print(list_map)
-        return_map = {}
-        for machine_id in list_map:
-            for workload_id in list_map[machine_id]:
-                for config_id in list_map[machine_id][workload_id]:
-                    item = list_map[machine_id][workload_id][config_id]
-
-                    if len(grouping_features) == 1:
-                        if 'machine_id' in grouping_features:
-                            if machine_id in return_map:
-                                print('MACHINE ID GROUPING {}'.format(machine_id))
-                                return_map[machine_id] += item 
-                            else:
-                                return_map[machine_id] = item 
-                        elif 'workload_id' in grouping_features:
-                            if workload_id in return_map:
-                                return_map[workload_id] += item 
-                            else:
-                                return_map[workload_id] = item 
-                        else:
-                            if config_id in return_map:
-                                return_map[config_id] += item 
-                            else:
-                                return_map[config_id] = item 
-                    elif len(grouping_features) == 2:
-                        if 'machine_id' in grouping_features:
-                            if 'workload_id' in grouping_features:
-                                key = "{}_{}".format(machine_id, workload_id)
-                                if key in return_map:
-                                    return_map[key] += item 
-                                else:
-                                    return_map[key] = item 
-                            else:
-                                key = "{}_{}".format(machine_id, config_id)
-                                if key in return_map:
-                                    return_map[key] += item 
-                                else:
-                                    return_map[key] = item 
-                        else:
-                            key = "{}_{}".format(workload_id, config_id)
-                            if key in return_map:
-                                return_map[key] += item 
-                            else:
-                                return_map[key] = item 
-                    else:
-                        key = "{}_{}_{}".format(machine_id, workload_id, config_id)
-                        if key in return_map:
-                            return_map[key] += item 
-                        else:
-                            return_map[key] = item 
-        return return_map 
-
-
-    def plot_overhead_vs_bandwidth(self, output_dir):
-        machine_id_set = set()
-        workload_id_set = set()
-        config_key_set = set()
-
-        mt_bytes_map = {}
-        t2_hit_count_map = {}
-        percent_delta_bandwidth_map = {}
-        byte_per_t2_hit_map = {}
-        overhead_map = {}
-        overhead_per_t2_map = {}
-
-        for db_unit in self.unit_list:
+    def get_overhead_df(self):
+        """ Get a long-format DataFrame with a row per predictor for each pair of ST and MT output 
+            with the same tier-1 size. Each row has the features of the MT experiment, the percent 
+            change in bandwidth due to the tier-2 cache ("bandwidth"), the name of the predictor 
+            ("pred_name") and its value ("pred_value"). 
+        """
+        row_list = []
+        for db_unit in self.iter_units():
             machine_id = db_unit._machine_id 
             workload_id = db_unit._workload_id 
-            machine_id_set.add(machine_id)
-            workload_id_set.add(workload_id)
 
             # get pair of ST and MT from each db unit 
             for st_mt_pair in db_unit.get_st_mt_pairs():
                 st_row = st_mt_pair[0]
                 mt_row = st_mt_pair[1]
 
-                # get all the files relevant to the ST and MT rows 
-                st_output_files = db_unit.get_output_files_per_row(st_row)
-                mt_output_files = db_unit.get_output_files_per_row(mt_row)
-
-                for st_mt_pair in list(itertools.product(st_output_files, mt_output_files)):
-                    st_output_file = st_mt_pair[0]
-                    mt_output_file = st_mt_pair[1]
-
-                    # load the two experiment output files and get the difference 
-                    st_output = ExperimentOutput(st_output_file)
-                    mt_output = ExperimentOutput(mt_output_file)
-
-                    if not st_output.is_output_complete() or not mt_output.is_output_complete():
-                        continue 
-
-                    config_key = mt_output.get_config_key()
-                    config_key_set.add(config_key)
+                # get the outputs of all iterations of the ST and MT rows, these are already 
+                # loaded by the DBUnit and are all complete 
+                st_outputs = db_unit.get_outputs_per_row(st_row)
+                mt_outputs = db_unit.get_outputs_per_row(mt_row)
 
+                for st_output, mt_output in itertools.product(st_outputs, mt_outputs):
                     # get when t2 hits start 
                     t2_hr_at_T = mt_output.t2_hit_start
+                    if t2_hr_at_T == -1:
+                        continue 
+
+                    # the ST snapshots are not taken at the same time as MT so use the nearest ST snapshot 
                     mt_bytes = mt_output.get_bytes_at_T(t2_hr_at_T)
                     st_bytes = st_output.get_bytes_at_T(t2_hr_at_T)
                     
@@ -275,73 +453,163 @@ class MTDB:
 
                         total_overhead = overhead_byte_per_read_miss_and_write_byte*(total_read_miss_byte+total_write_miss_byte)
                         total_overhead_per_t2_hit = total_overhead/t2_hit_count
-                        
-                        self.addToMap(mt_bytes_map, machine_id, workload_id, config_key, mt_bytes-st_bytes)
-                        self.addToMap(t2_hit_count_map, machine_id, workload_id, config_key, t2_hit_count)
-                        self.addToMap(percent_delta_bandwidth_map, machine_id, workload_id, config_key, percent_delta_bandwidth)
-                        self.addToMap(byte_per_t2_hit_map, machine_id, workload_id, config_key, (mt_bytes-st_bytes)/t2_hit_count)
-                        self.addToMap(overhead_map, machine_id, workload_id, config_key, total_overhead)
-                        self.addToMap(overhead_per_t2_map, machine_id, workload_id, config_key, total_overhead_per_t2_hit)
-
-        #print(mt_bytes_map)
-
-        # group based on machine, workload and config 
-        grouping_params = ["machine_id", "workload_id", "config_id"]
-        perf_pred_pairs = [["byte_overhead", "bandwidth"], ["t2_hit_count", "bandwidth"], ["byte_per_t2_hit", "bandwidth"], ["overhead", "bandwidth"], ["overhead_per_t2", "bandwidth"]]
+
+                        pred_map = {
+                            "byte_overhead": mt_bytes-st_bytes,
+                            "t2_hit_count": t2_hit_count,
+                            "byte_per_t2_hit": (mt_bytes-st_bytes)/t2_hit_count,
+                            "overhead": total_overhead,
+                            "overhead_per_t2": total_overhead_per_t2_hit
+                        }
+                        for pred_name, pred_value in pred_map.items():
+                            row_list.append([machine_id,
+                                                workload_id,
+                                                mt_output.get_config_key(),
+                                                mt_output.input_queue_size,
+                                                mt_output.processor_thread_count,
+                                                mt_output.iat_scale_factor,
+                                                mt_output.ram_cache_size_mb,
+                                                mt_output.nvm_cache_size_mb,
+                                                percent_delta_bandwidth,
+                                                pred_name,
+                                                pred_value])
+
+        df = pd.DataFrame(row_list, columns=["machine_id", "workload_id", "config_id", "inputQueueSize", 
+                                                "processorThreadCount", "scaleIAT", "cacheSizeMB", 
+                                                "nvmCacheSizeMB", "bandwidth", "pred_name", "pred_value"])
+
+        # the features used to group rows and the predictor name are stored as categorical codes 
+        for column_name in df.columns:
+            if column_name not in ["bandwidth", "pred_value"]:
+                df[column_name] = df[column_name].astype("category")
+        return df 
+
+
+    def plot_overhead_vs_bandwidth(self, output_dir, grouping_params=["machine_id", "workload_id", "config_id"]):
+        # scatter plot of the percent change in bandwidth and each predictor for the rows in every group 
+        # of every combination of the grouping features, the grouping features can be any feature in 
+        # the DataFrame returned by get_overhead_df(), returns the summary of the plots rendered 
+        # groups span DBUnits, so the plots are recorded in the plot manifest of the output dir with 
+        # the fingerprint of every output file and the filters, nothing is loaded if the plots are current 
+        unit_map = self.index.get_unit_map(self.filters)
+        plot_manifest = PlotManifest(output_dir)
+        plot_key = self._get_plot_key("overhead", self.filters)
+        fingerprint = get_input_fingerprint([Manifest.get_fingerprint(output_path_list) for output_path_list in unit_map.values()],
+                                                self.eval, grouping_params)
+        plot_pool = PlotPool(self.workers)
+        if plot_manifest.is_current(plot_key, fingerprint):
+            return plot_pool.run()
+
+        # each group plot is recorded with the fingerprint of its points, so a plot is made again only if 
+        # its points changed and the plots of groups that are filtered out of this run are kept 
+        file_list, file_record_list = [], []
+        overhead_df = self.get_overhead_df()
+        perf_metric = "bandwidth"
         for grouping_size in range(1, len(grouping_params)+1):
             for combo in itertools.combinations(grouping_params, grouping_size):
                 cur_output_dir = output_dir.joinpath("_".join([_ for _ in combo]))
                 cur_output_dir.mkdir(exist_ok=True, parents=True)
 
-                perf_map = self.get_list_from_map_groups(percent_delta_bandwidth_map, combo)
-
-                for perf_pred_pair in perf_pred_pairs:
-                    output_file_name = "{}-{}.png".format(perf_pred_pair[0], perf_pred_pair[1])
-                    
-                    if perf_pred_pair[0] == "byte_overhead":
-                        pred_map = self.get_list_from_map_groups(mt_bytes_map, combo)
-                    elif perf_pred_pair[0] == "t2_hit_count":
-                        pred_map = self.get_list_from_map_groups(t2_hit_count_map, combo)
-                    elif perf_pred_pair[0] == "byte_per_t2_hit":
-                        pred_map = self.get_list_from_map_groups(byte_per_t2_hit_map, combo)
-                    elif perf_pred_pair[0] == "overhead":
-                        pred_map = self.get_list_from_map_groups(overhead_map, combo)
-                    elif perf_pred_pair[0] == "overhead_per_t2":
-                        pred_map = self.get_list_from_map_groups(overhead_per_t2_map, combo)
-                    
-                    for key in pred_map:
-                        temp_output_dir = cur_output_dir.joinpath(key)
-                        temp_output_dir.mkdir(parents=True, exist_ok=True)
-                        temp_output_path = temp_output_dir.joinpath(output_file_name)
-
-                        if not temp_output_path.exists():
-                            _, ax = plt.subplots(figsize=[14, 10])
-                            ax.scatter(perf_map[key], pred_map[key], s=80, alpha=0.6)
-
-                            ax.set_xlabel(perf_pred_pair[1])
-                            ax.set_ylabel(perf_pred_pair[0])
+                # a single groupby of the rows of all predictors for each combination of grouping features 
+                for group_tuple, group_df in overhead_df.groupby(list(combo) + ["pred_name"], observed=True, sort=False):
+                    pred_name = group_tuple[-1]
+                    output_file_name = "{}-{}.png".format(pred_name, perf_metric)
+                    key = "_".join([str(value) for value in group_tuple[:-1]])
+
+                    temp_output_dir = cur_output_dir.joinpath(key)
+                    temp_output_dir.mkdir(parents=True, exist_ok=True)
+                    temp_output_path = temp_output_dir.joinpath(output_file_name)
+                    file_key = str(temp_output_path.relative_to(output_dir))
+                    file_list.append(file_key)
+
+                    perf_array, pred_array = group_df[perf_metric].to_numpy(), group_df["pred_value"].to_numpy()
+                    file_fingerprint = get_input_fingerprint(perf_array, pred_array)
+                    file_record_list.append((file_key, file_fingerprint))
+                    if not plot_manifest.is_current(file_key, file_fingerprint):
+                        plot_pool.add_scatter(temp_output_path, perf_array, pred_array, perf_metric, pred_name)
+
+        summary = plot_pool.run()
+        for file_key, file_fingerprint in file_record_list:
+            plot_manifest.update(file_key, file_fingerprint, [file_key])
+        plot_manifest.update(plot_key, fingerprint, file_list, remove_stale=False)
+        plot_manifest.save()
+        return summary 
+
+
+    def _get_combined_df(self, eval=None):
+        # the percentage difference in stats between MT and its corresponding 
+        # ST cache from all eligible points using an eval type (self.eval by default) 
+        # in stream mode only the diff df of each DBUnit is kept in memory 
+        df_list = [db_unit.get_diff_df(eval) for db_unit in self.iter_units()]
+        if len(df_list) == 0:
+            return None 
+        return pd.concat(df_list, ignore_index=True) 
+
+
+    def get_multi_eval_df(self, eval_list=EVAL_LIST):
+        # the combined df of multiple eval types with a column "eval" for the eval type of each row 
+        df_list_map = {eval_type: [] for eval_type in eval_list}
+        for db_unit in self.iter_units():
+            for eval_type in eval_list:
+                df_list_map[eval_type].append(db_unit.get_diff_df(eval_type).assign(eval=eval_type))
+
+        df_list = [df for eval_type in eval_list for df in df_list_map[eval_type]]
+        if len(df_list) == 0:
+            return None 
+        return pd.concat(df_list, ignore_index=True)
+
+
+    def get_warehouse_fingerprint(self, eval=None):
+        # fingerprint of the output files that match the filters from the directory listing and the eval 
+        # type (self.eval by default) of a combined DataFrame, it is computed without loading any DBUnit 
+        if eval is None:
+            eval = self.eval 
+        unit_map = self.index.get_unit_map(self.filters)
+        return get_input_fingerprint([(str(db_unit_path), Manifest.get_fingerprint(output_path_list)) \
+                                        for db_unit_path, output_path_list in unit_map.items()], eval)
+
+
+    def save_warehouse(self, warehouse_dir, eval=None):
+        # store the combined DataFrame of an eval type in a warehouse partitioned by machine and workload 
+        # along with the fingerprint of the output files it was built from 
+        fingerprint = self.get_warehouse_fingerprint(eval)
+        df = self._get_combined_df(eval)
+        if df is None:
+            df = pd.DataFrame(columns=PARTITION_FEATURE_LIST)
+        warehouse = Warehouse(warehouse_dir)
+        warehouse.save(df, fingerprint=fingerprint)
+        return warehouse 
+
+
+    def get_config_cube(self, eval=None, metric_list=None, diff=False):
+        """ Get a ConfigCube of the metrics of the experiment sets of an eval type (self.eval by default) 
+            of every DBUnit. If diff is True, the cube has the percentage difference between each MT 
+            cache and its ST cache instead. 
+        """
+        df_list = []
+        for db_unit in self.iter_units():
+            if diff:
+                df_list.append(db_unit.get_diff_df(eval))
+            else:
+                df_list.append(db_unit.get_experiment_set_df(eval))
 
-                            plt.tight_layout()
-                            plt.savefig(temp_output_path)
-                            plt.close()
-                            print("Plot done: {}".format(temp_output_path))
+        df_list = [df for df in df_list if len(df) > 0]
+        if len(df_list) == 0:
+            return None 
+        return ConfigCube(pd.concat(df_list, ignore_index=True), metric_list=metric_list)
 
 
-    def _get_combined_df(self):
-        # the percentage difference in stats between MT and its corresponding 
-        # ST cache from all eligible points 
-        df = None 
-        for db_unit in self.unit_list:
-            if df is None:
-                df = db_unit.get_diff_df()
-            else:
-                df = df.append(db_unit.get_diff_df(), ignore_index=True) 
-        return df 
+    def get_iteration_variance_df(self):
+        # the variance of metrics across iterations of each experiment set of every DBUnit 
+        df_list = [db_unit.get_iteration_variance_df() for db_unit in self.iter_units()]
+        if len(df_list) == 0:
+            return None 
+        return pd.concat(df_list, ignore_index=True)
 
 
     def get_opt_count(self):
         st_opt_count, mt_opt_count, np_mt_opt_count = 0, 0, 0 
-        for db_unit in self.unit_list:
+        for db_unit in self.iter_units():
             st_opt_count += db_unit.st_opt_count 
             mt_opt_count += db_unit.mt_opt_count 
             np_mt_opt_count += db_unit.np_mt_opt_count 
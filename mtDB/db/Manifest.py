@@ -0,0 +1,89 @@
+import os
+import pathlib
+import pickle
+
+from mtDB.db.RecordFile import get_path_hash, write_atomic
+
+
+# version of the manifest record format, it changes when the data stored in a DBUnit changes
+MANIFEST_VERSION = 7
+
+
+""" This class stores each DBUnit built by MTDB in a manifest directory
+    along with the list of output files used to build it and their
+    fingerprints (name, size, mtime). When MTDB is loaded again, a DBUnit
+    is restored from the manifest if the output files in its directory
+    have not changed, so only directories with new or updated output
+    files are loaded again. The ExperimentOutputs of a DBUnit are not stored,
+    only its tables and running aggregates, and the outputs are loaded again
+    from the output files when they are accessed.
+"""
+class Manifest:
+    def __init__(self, manifest_dir):
+        self.manifest_dir = pathlib.Path(manifest_dir)
+        self.manifest_dir.mkdir(parents=True, exist_ok=True)
+
+        # number of DBUnits restored from and saved to the manifest
+        self.hit_count = 0
+        self.miss_count = 0
+
+
+    def _get_record_path(self, db_unit_path, setting_map):
+        # the name of the record is the hash of the absolute path of the directory and the settings
+        return self.manifest_dir.joinpath("{}.pkl".format(get_path_hash(db_unit_path, sorted(setting_map.items()))))
+
+
+    @staticmethod
+    def get_fingerprint(output_path_list):
+        # the name, size and modification time of each output file
+        fingerprint = []
+        for output_path in output_path_list:
+            file_stat = os.stat(output_path)
+            fingerprint.append((pathlib.Path(output_path).name, file_stat.st_size, file_stat.st_mtime_ns))
+        return tuple(fingerprint)
+
+
+    def _read_record(self, db_unit_path, setting_map):
+        # the record of a directory or None if it is not in the manifest or of a different version 
+        record_path = self._get_record_path(db_unit_path, setting_map)
+        try:
+            with record_path.open("rb") as f:
+                record = pickle.load(f)
+        except (OSError, EOFError, AttributeError, pickle.UnpicklingError):
+            return None
+
+        if record.get("version") != MANIFEST_VERSION or record.get("setting_map") != setting_map:
+            return None
+        return record
+
+
+    def load(self, db_unit_path, fingerprint, setting_map):
+        # get the DBUnit of a directory or None if it is not in the manifest or its output files changed
+        record = self._read_record(db_unit_path, setting_map)
+        if record is None or record.get("fingerprint") != fingerprint:
+            self.miss_count += 1
+            return None
+
+        self.hit_count += 1
+        return record["db_unit"]
+
+
+    def load_previous(self, db_unit_path, setting_map):
+        # get the fingerprint and DBUnit of a directory even if its output files changed, (None, None)
+        # if it is not in the manifest, used to add only the new output files to the DBUnit
+        record = self._read_record(db_unit_path, setting_map)
+        if record is None:
+            return None, None
+        return record["fingerprint"], record["db_unit"]
+
+
+    def save(self, db_unit_path, fingerprint, setting_map, db_unit):
+        # write the DBUnit of a directory to the manifest
+        record = {
+            "version": MANIFEST_VERSION,
+            "setting_map": setting_map,
+            "fingerprint": fingerprint,
+            "db_unit": db_unit
+        }
+        write_atomic(self._get_record_path(db_unit_path, setting_map), 
+                        lambda f: pickle.dump(record, f, protocol=pickle.HIGHEST_PROTOCOL))
@@ -0,0 +1,71 @@
+import os
+import pathlib
+import pickle
+
+from mtDB.db.RecordFile import get_path_hash, write_atomic
+
+
+# version of the cache record format, records with a different version are ignored
+CACHE_VERSION = 3
+
+
+""" This class stores the parsed contents of experiment output files
+    in a cache directory so that an output file is only parsed again
+    when it changes.
+
+    Each output file has a binary record in the cache directory for its
+    config and summary stats and a separate record for its time series
+    so that the time series is only read when it is needed. A record
+    contains the fingerprint (size, mtime) of the output file at the
+    time it was parsed along with the parsed data. A record is only
+    used if the fingerprint of the output file has not changed.
+"""
+class OutputCache:
+    def __init__(self, cache_dir):
+        self.cache_dir = pathlib.Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        # number of records read from and written to the cache
+        self.hit_count = 0
+        self.miss_count = 0
+
+
+    def _get_record_path(self, output_path, record_name):
+        # the name of the record is the hash of the absolute path of the output file and the record name
+        return self.cache_dir.joinpath("{}.{}.pkl".format(get_path_hash(output_path), record_name))
+
+
+    def get_fingerprint(self, output_path):
+        # the size and modification time of the file
+        file_stat = os.stat(output_path)
+        return file_stat.st_size, file_stat.st_mtime_ns
+
+
+    def load(self, output_path, record_name="output"):
+        # get the parsed data of an output file or None if the cache entry is missing or stale
+        record_path = self._get_record_path(output_path, record_name)
+        try:
+            with record_path.open("rb") as f:
+                record = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            self.miss_count += 1
+            return None
+
+        if record.get("version") != CACHE_VERSION or \
+                record.get("fingerprint") != self.get_fingerprint(output_path):
+            self.miss_count += 1
+            return None
+
+        self.hit_count += 1
+        return record["data"]
+
+
+    def save(self, output_path, data, record_name="output"):
+        # write the parsed data of an output file to the cache
+        record = {
+            "version": CACHE_VERSION,
+            "fingerprint": self.get_fingerprint(output_path),
+            "data": data
+        }
+        write_atomic(self._get_record_path(output_path, record_name), 
+                        lambda f: pickle.dump(record, f, protocol=pickle.HIGHEST_PROTOCOL))
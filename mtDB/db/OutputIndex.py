@@ -0,0 +1,99 @@
+import os
+import pathlib
+import pandas as pd
+
+
+# features of an experiment that are encoded in the path of its output file
+# the output file is at *machine_id*/*workload_id*/*queue*_*threads*_*iat*_*t1*_*t2*_*iteration*
+INDEX_FEATURE_LIST = ["machine_id", "workload_id", "inputQueueSize", "processorThreadCount", "scaleIAT",
+                        "cacheSizeMB", "nvmCacheSizeMB", "iteration"]
+
+
+def normalize_filters(filters, feature_list=INDEX_FEATURE_LIST):
+    """ Get the filters with a list of values for each feature. The filters is a dict where the key
+        is a feature in feature_list and the value is a value or list of values of the feature.
+        For instance, {"machine_id": "c220g1", "workload_id": ["w82"], "scaleIAT": 100}
+    """
+    if filters is None:
+        return None
+
+    normalized_filters = {}
+    for feature_name, value in filters.items():
+        if feature_name not in feature_list:
+            raise ValueError("Cannot filter by {}, features available are {}".format(feature_name, feature_list))
+
+        if not isinstance(value, (list, tuple, set)):
+            value = [value]
+        normalized_filters[feature_name] = list(value)
+    return normalized_filters
+
+
+""" This class indexes the experiment output files in a data directory
+    using only the directory listing. The features of each experiment
+    are read from the path of its output file so that experiments can
+    be selected without opening any output file.
+"""
+class OutputIndex:
+    def __init__(self, data_dir):
+        self.data_dir = pathlib.Path(data_dir)
+
+        # one row per output file with the features in INDEX_FEATURE_LIST and its path
+        self.df = pd.DataFrame(columns=INDEX_FEATURE_LIST + ["path"])
+
+        # files whose name does not have the format of an output file
+        self.unknown_file_list = []
+
+        self._load()
+
+
+    def _load(self):
+        # each directory containing files is a DBUnit with path of format-> MACHINE/WORKLOAD/DATAFILE
+        row_list = []
+        for dir_path, dir_name_list, file_name_list in os.walk(self.data_dir):
+            # walk the directories in sorted order so that the index is the same every time
+            dir_name_list.sort()
+            if len(file_name_list) == 0:
+                continue
+
+            unit_dir = pathlib.Path(dir_path)
+            for file_name in sorted(file_name_list):
+                split_file_name = file_name.split("_")
+                try:
+                    config_list = [int(value) for value in split_file_name]
+                except ValueError:
+                    config_list = []
+
+                if len(config_list) != 6:
+                    self.unknown_file_list.append(unit_dir.joinpath(file_name))
+                    continue
+
+                row_list.append([unit_dir.parent.name, unit_dir.name] + config_list + [unit_dir.joinpath(file_name)])
+
+        if len(row_list) > 0:
+            self.df = pd.DataFrame(row_list, columns=INDEX_FEATURE_LIST + ["path"])
+
+
+    def filter(self, filters=None):
+        # get the rows of output files that match the filters (see normalize_filters for the format of filters)
+        if filters is None:
+            return self.df
+
+        mask = pd.Series(True, index=self.df.index)
+        for feature_name, value_list in normalize_filters(filters).items():
+            mask &= self.df[feature_name].isin(value_list)
+        return self.df[mask]
+
+
+    def get_unit_map(self, filters=None):
+        # map of the directory of each DBUnit to the list of output files in it that match the filters
+        unit_map = {}
+        for path in self.filter(filters)["path"]:
+            unit_dir = path.parent
+            if unit_dir not in unit_map:
+                unit_map[unit_dir] = []
+            unit_map[unit_dir].append(path)
+        return unit_map
+
+
+    def get_file_count(self):
+        return len(self.df)
@@ -0,0 +1,86 @@
+import os
+import pathlib
+
+
+# summary stats that are written at the end of a complete output file
+COMPLETE_OUTPUT_KEY_LIST = ["t2WriteLat_p100_us", "t2GetCount", "bandwidth_byte/s"]
+
+# size of the first block read from the end of the file, it is multiplied by 4
+# each time the block does not contain the last snapshot of the time series
+TAIL_BLOCK_SIZE_BYTE = 16*1024
+MAX_TAIL_BLOCK_SIZE_BYTE = 4*1024*1024
+
+
+""" This class checks an experiment output file without parsing it.
+
+    The summary stats of an experiment are written after the last
+    snapshot of the time series ("stat:" lines), so reading a block from
+    the end of the file is enough to find the summary stats and check
+    whether the output is complete.
+"""
+class OutputProbe:
+    def __init__(self, output_path):
+        self._output_path = pathlib.Path(output_path)
+
+
+    def read_summary_block(self):
+        """ Get the bytes after the line containing the last snapshot of the time series.
+            Returns None if no snapshot is found in the last MAX_TAIL_BLOCK_SIZE_BYTE bytes
+            of the file. If there are no snapshots in the file, all bytes are returned.
+        """
+        with self._output_path.open("rb") as f:
+            file_size = f.seek(0, os.SEEK_END)
+            block_size = TAIL_BLOCK_SIZE_BYTE
+            while True:
+                block_start = max(0, file_size - block_size)
+                f.seek(block_start)
+                data = f.read(file_size - block_start)
+                snapshot_index = data.rfind(b"stat:")
+                if snapshot_index >= 0 or block_start == 0:
+                    break
+                if block_size >= MAX_TAIL_BLOCK_SIZE_BYTE:
+                    return None
+                block_size *= 4
+
+        if snapshot_index == -1:
+            return data
+
+        line_end_index = data.find(b"\n", snapshot_index)
+        if line_end_index == -1:
+            return b""
+        return data[line_end_index+1:]
+
+
+    def get_summary_lines(self):
+        # lines after the last snapshot or None if the last snapshot was not found
+        data = self.read_summary_block()
+        if data is None:
+            return None
+        return data.decode().splitlines()
+
+
+    def classify_block(self, data, is_whole_summary=False):
+        """ Check if a block of bytes from the end of an output file is from a complete output.
+            Returns True if all the summary stats of a complete output are in the block, False if
+            some are missing after the last snapshot (or the block has all the bytes after the last
+            snapshot) and None if the block is too small to tell.
+        """
+        data = b"\n" + data
+        if all([b"\n" + key.encode() + b"=" in data for key in COMPLETE_OUTPUT_KEY_LIST]):
+            return True
+        elif b"stat:" in data or is_whole_summary:
+            return False
+        else:
+            return None
+
+
+    def is_complete(self):
+        # check if the output file has all the summary stats of a complete output
+        try:
+            data = self.read_summary_block()
+        except OSError:
+            return False
+
+        if data is None:
+            return False
+        return self.classify_block(data, is_whole_summary=True)
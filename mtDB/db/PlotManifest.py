@@ -0,0 +1,77 @@
+import json
+import pathlib
+import hashlib
+import numpy as np
+
+from mtDB.db.RecordFile import write_atomic
+
+
+# name of the sidecar file in each plot output directory
+PLOT_MANIFEST_FILE_NAME = ".plots.json"
+
+
+def _get_json_value(value):
+    # arrays are represented by the hash of their data, other values by their string
+    if isinstance(value, np.ndarray):
+        return hashlib.sha1(np.ascontiguousarray(value).tobytes()).hexdigest()
+    return str(value)
+
+
+def get_input_fingerprint(*input_list):
+    # hash of the inputs of a set of plots, e.g. the fingerprint of output files and the plot settings
+    # or the arrays plotted
+    return hashlib.sha1(json.dumps(input_list, default=_get_json_value).encode("utf-8")).hexdigest()
+
+
+""" This class stores a sidecar JSON file in a plot output directory that
+    maps the key of each set of plots in the directory to the fingerprint of
+    the inputs it was made from and the list of files plotted. Before any
+    data is loaded, the plotting functions check whether the plots of a key
+    are current (same fingerprint and every file exists) so that only the
+    data of missing or stale plots is loaded and plotted again.
+"""
+class PlotManifest:
+    def __init__(self, output_dir):
+        self.output_dir = pathlib.Path(output_dir)
+        self._manifest_path = self.output_dir.joinpath(PLOT_MANIFEST_FILE_NAME)
+        self._record_map = {}
+        try:
+            with self._manifest_path.open("r") as f:
+                self._record_map = json.load(f)
+        except (OSError, ValueError):
+            self._record_map = {}
+
+
+    def has_record(self, key):
+        return key in self._record_map
+
+
+    def is_current(self, key, fingerprint):
+        # the plots of a key are current if they were made from the same inputs and every file exists
+        record = self._record_map.get(key)
+        if record is None or record["fingerprint"] != fingerprint:
+            return False
+        return all([self.output_dir.joinpath(file_name).exists() for file_name in record["file_list"]])
+
+
+    def is_stale(self, key, fingerprint):
+        # the plots of a key are stale if they were made from different inputs
+        return key in self._record_map and self._record_map[key]["fingerprint"] != fingerprint
+
+
+    def update(self, key, fingerprint, file_list, remove_stale=True):
+        """ Record the files plotted for a key and their input fingerprint. If remove_stale is True,
+            files that were recorded for the key with a different fingerprint and are not in the new
+            list are removed since they were plotted from stale inputs.
+        """
+        file_list = sorted([str(pathlib.Path(file_name).relative_to(self.output_dir)) \
+                                if pathlib.Path(file_name).is_absolute() else str(file_name) for file_name in file_list])
+        if remove_stale and self.is_stale(key, fingerprint):
+            for file_name in set(self._record_map[key]["file_list"]) - set(file_list):
+                self.output_dir.joinpath(file_name).unlink(missing_ok=True)
+        self._record_map[key] = {"fingerprint": fingerprint, "file_list": file_list}
+
+
+    def save(self):
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        write_atomic(self._manifest_path, lambda f: json.dump(self._record_map, f, indent=2), binary=False)
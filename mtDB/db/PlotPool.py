@@ -0,0 +1,139 @@
+import time
+import multiprocessing
+import matplotlib
+import matplotlib.pyplot as plt
+
+
+def _init_worker(rc_params):
+    # worker processes render with a non-interactive backend and the rc params of the parent process
+    matplotlib.use("Agg")
+    plt.rcParams.update(rc_params)
+
+
+def render_plot(plot_job):
+    """ Render a plot job and save it to its output path. A plot job is a dict with the
+        output path ("output_path"), the figure size ("figsize") and a list of panels
+        ("panel_list") drawn top to bottom with a shared x-axis. Each panel is a dict with,
+            - series_list: list of dict with the x and y arrays ("x", "y"), the kind of plot
+                ("line" or "scatter"), the line style ("style") and the legend label ("label")
+            - x_label, y_label: labels of the axes, the x label is not set if None
+            - ylog: flag indicating whether the y-axis is in log scale
+            - legend: flag indicating whether the legend is drawn
+    """
+    panel_list = plot_job["panel_list"]
+    _, ax_list = plt.subplots(nrows=len(panel_list), figsize=plot_job["figsize"],
+                                sharex=len(panel_list) > 1, squeeze=False)
+    for ax, panel in zip(ax_list[:, 0], panel_list):
+        for series in panel["series_list"]:
+            if series["kind"] == "line":
+                ax.plot(series["x"], series["y"], series["style"], markersize=10, label=series["label"])
+            else:
+                ax.scatter(series["x"], series["y"], s=80, alpha=0.6, label=series["label"])
+
+        if panel["x_label"] is not None:
+            ax.set_xlabel(panel["x_label"])
+        ax.set_ylabel(panel["y_label"])
+
+        if panel["ylog"]:
+            ax.set_yscale("log")
+
+        if panel["legend"]:
+            ax.legend()
+
+    plt.tight_layout()
+    plt.savefig(plot_job["output_path"])
+    plt.close()
+    return plot_job["output_path"]
+
+
+""" This class queues plot jobs, each with the data arrays, labels and
+    output path of a plot, and renders them in a pool of worker processes
+    that use a non-interactive backend when run() is called. The time to
+    render plots is dominated by matplotlib, so rendering in parallel
+    scales with the number of workers.
+
+    If there is a single worker, the plots are rendered in this process.
+"""
+class PlotPool:
+    def __init__(self, workers=1, verbose=True):
+        self.workers = workers
+        self.verbose = verbose
+        self._job_list = []
+
+        # summary of the plots rendered by the last call to run()
+        self.job_count = 0
+        self.runtime = 0.0
+
+
+    def __len__(self):
+        return len(self._job_list)
+
+
+    def add(self, output_path, panel_list, figsize=[14, 10]):
+        # queue a plot job, see render_plot for the format of the list of panels
+        self._job_list.append({
+            "output_path": output_path,
+            "panel_list": panel_list,
+            "figsize": figsize
+        })
+
+
+    def add_line(self, output_path, series_list, x_label, y_label):
+        # queue a single panel plot with a line per (x, y, style, label) tuple in the series list
+        self.add(output_path, [self.get_line_panel(series_list, x_label, y_label)])
+
+
+    def add_scatter(self, output_path, x_list, y_list, x_label, y_label, ylog=False):
+        # queue a scatter plot of a pair of arrays
+        self.add(output_path, [{
+            "series_list": [{"kind": "scatter", "x": x_list, "y": y_list, "style": None, "label": None}],
+            "x_label": x_label,
+            "y_label": y_label,
+            "ylog": ylog,
+            "legend": False
+        }])
+
+
+    @staticmethod
+    def get_line_panel(series_list, x_label, y_label):
+        # panel with a line per (x, y, style, label) tuple in the series list and a legend
+        return {
+            "series_list": [{"kind": "line", "x": x, "y": y, "style": style, "label": label} for x, y, style, label in series_list],
+            "x_label": x_label,
+            "y_label": y_label,
+            "ylog": False,
+            "legend": True
+        }
+
+
+    def run(self):
+        """ Render every queued plot job and clear the queue. Returns a dict with the number
+            of plots rendered ("job_count"), the time taken in seconds ("runtime") and the
+            number of plots rendered per second ("throughput").
+        """
+        job_list, self._job_list = self._job_list, []
+        start_time = time.perf_counter()
+        if self.workers > 1 and len(job_list) > 1:
+            rc_params = {"font.size": plt.rcParams["font.size"]}
+            chunk_size = max(1, len(job_list)//(4*self.workers))
+            with multiprocessing.Pool(self.workers, initializer=_init_worker, initargs=(rc_params,)) as pool:
+                for output_path in pool.imap_unordered(render_plot, job_list, chunksize=chunk_size):
+                    if self.verbose:
+                        print("Plot done: {}".format(output_path))
+        else:
+            for plot_job in job_list:
+                output_path = render_plot(plot_job)
+                if self.verbose:
+                    print("Plot done: {}".format(output_path))
+
+        self.job_count = len(job_list)
+        self.runtime = time.perf_counter() - start_time
+        summary = {
+            "job_count": self.job_count,
+            "runtime": self.runtime,
+            "throughput": self.job_count/self.runtime if self.runtime > 0 else 0.0
+        }
+        if self.job_count > 0:
+            print("Rendered {} plots in {:.1f}s ({:.1f} plots/s) with {} workers".format(
+                summary["job_count"], summary["runtime"], summary["throughput"], self.workers))
+        return summary
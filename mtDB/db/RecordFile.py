@@ -0,0 +1,25 @@
+import os
+import pathlib
+import hashlib
+
+
+def get_path_hash(path, *key_list):
+    # hash of the absolute path of a file or directory and any keys, used to name the records of a path
+    record_key = "-".join([str(pathlib.Path(path).resolve())] + [str(key) for key in key_list])
+    return hashlib.sha1(record_key.encode("utf-8")).hexdigest()
+
+
+def get_temp_path(path):
+    # temporary path next to a file or directory, unique to this process
+    path = pathlib.Path(path)
+    return path.with_name("{}.{}.tmp".format(path.name, os.getpid()))
+
+
+def write_atomic(path, write_func, binary=True):
+    """ Write a file by calling write_func with an open temporary file and then renaming the
+        temporary file to the path, so that readers of the path never see a partial file.
+    """
+    temp_path = get_temp_path(path)
+    with temp_path.open("wb" if binary else "w") as f:
+        write_func(f)
+    os.replace(temp_path, path)
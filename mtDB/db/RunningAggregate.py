@@ -0,0 +1,82 @@
+import numpy as np
+
+
+""" This class keeps running aggregates of the metrics of the iterations
+    of an experiment set. The count, mean and sum of squared differences
+    from the mean (M2) of each metric are updated with Welford's method
+    and the iteration with the highest bandwidth is kept, so that adding
+    an iteration takes constant time and older iterations are not read
+    again. A metric that is NaN in an iteration is skipped like in pandas.
+"""
+class RunningAggregate:
+    def __init__(self):
+        # arrays with a value per metric, a new metric is added at the end of the arrays
+        self._count_array = np.zeros(0, dtype=np.int64)
+        self._mean_array = np.zeros(0, dtype=np.float64)
+        self._m2_array = np.zeros(0, dtype=np.float64)
+
+        # values of the metrics of the iteration with the highest bandwidth
+        self._best_array = None
+        self._best_bandwidth = np.nan
+
+        # number of iterations added
+        self.iteration_count = 0
+
+
+    def _resize(self, metric_count):
+        # add metrics that were not in the earlier iterations
+        pad_count = metric_count - len(self._count_array)
+        if pad_count > 0:
+            self._count_array = np.concatenate([self._count_array, np.zeros(pad_count, dtype=np.int64)])
+            self._mean_array = np.concatenate([self._mean_array, np.zeros(pad_count, dtype=np.float64)])
+            self._m2_array = np.concatenate([self._m2_array, np.zeros(pad_count, dtype=np.float64)])
+
+
+    def _pad(self, value_array, metric_count):
+        # array of values of metric_count metrics where metrics not in the array are NaN
+        return np.concatenate([value_array, np.full(metric_count - len(value_array), np.nan)])
+
+
+    def update(self, value_array, bandwidth_index):
+        """ Add an iteration where value_array has a value for each metric and the metric
+            at bandwidth_index is the bandwidth. The metrics of every iteration must be in
+            the same order with new metrics added at the end.
+        """
+        value_array = np.asarray(value_array, dtype=np.float64)
+        self._resize(len(value_array))
+        value_array = self._pad(value_array, len(self._count_array))
+
+        valid_mask = ~np.isnan(value_array)
+        self._count_array[valid_mask] += 1
+        delta_array = value_array[valid_mask] - self._mean_array[valid_mask]
+        self._mean_array[valid_mask] += delta_array/self._count_array[valid_mask]
+        self._m2_array[valid_mask] += delta_array * (value_array[valid_mask] - self._mean_array[valid_mask])
+
+        # the first iteration with the highest bandwidth is kept
+        bandwidth = value_array[bandwidth_index]
+        if self._best_array is None or \
+                (np.isnan(self._best_bandwidth) and not np.isnan(bandwidth)) or \
+                bandwidth > self._best_bandwidth:
+            self._best_array = value_array
+            self._best_bandwidth = bandwidth
+
+        self.iteration_count += 1
+
+
+    def get_mean(self, metric_count):
+        # mean of each metric, NaN if the metric was not in any iteration
+        mean_array = np.where(self._count_array > 0, self._mean_array, np.nan)
+        return self._pad(mean_array, metric_count)
+
+
+    def get_variance(self, metric_count):
+        # sample variance of each metric, NaN if the metric is in less than 2 iterations
+        variance_array = np.full(len(self._count_array), np.nan)
+        valid_mask = self._count_array > 1
+        variance_array[valid_mask] = self._m2_array[valid_mask]/(self._count_array[valid_mask] - 1)
+        return self._pad(variance_array, metric_count)
+
+
+    def get_best(self, metric_count):
+        # metrics of the iteration with the highest bandwidth
+        return self._pad(self._best_array, metric_count)
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+
+
+# modes of aligning the snapshots of two time series
+ALIGN_MODE_LIST = ["index", "nearest", "grid"]
+
+
+""" This class aligns the snapshots of the time series of an ST and MT
+    experiment so that the values of a metric in ST and MT can be compared
+    at each point in time. The positions of the aligned snapshots are computed
+    once when the class is created and every metric is then aligned with an
+    index operation on its array.
+
+    The mode determines how snapshots are paired,
+        - index: snapshots with the same index, the time of snapshots at the same
+            index is not always equal in ST and MT (e.g. 60 in ST and 61 in MT)
+        - nearest: each MT snapshot in the time range of ST with the ST snapshot
+            closest to it
+        - grid: both time series linearly interpolated onto a common grid of time
+            with a fixed step in the time range of both
+"""
+class TimeSeriesAligner:
+    def __init__(self, st_ts, mt_ts, mode="index", grid_step=None):
+        if mode not in ALIGN_MODE_LIST:
+            raise ValueError("Unknown mode {} for time series alignment".format(mode))
+
+        self._st_ts = st_ts
+        self._mt_ts = mt_ts
+        self.mode = mode
+
+        # index of the ST and MT snapshot at each aligned point, None in grid mode
+        self._st_index = None
+        self._mt_index = None
+
+        if mode == "index":
+            x_len = min(len(st_ts), len(mt_ts))
+            self._st_index = np.arange(x_len)
+            self._mt_index = np.arange(x_len)
+            self.st_T = st_ts.T[:x_len]
+            self.mt_T = mt_ts.T[:x_len]
+        elif mode == "nearest":
+            if len(st_ts) == 0 or len(mt_ts) == 0:
+                self._mt_index = np.empty(0, dtype=np.int64)
+            else:
+                self._mt_index = np.nonzero((mt_ts.T >= st_ts.T[0]) & (mt_ts.T <= st_ts.T[-1]))[0]
+            self._st_index = st_ts.get_nearest_index(mt_ts.T[self._mt_index])
+            self.st_T = st_ts.T[self._st_index]
+            self.mt_T = mt_ts.T[self._mt_index]
+        else:
+            if len(st_ts) == 0 or len(mt_ts) == 0:
+                grid_T = np.empty(0, dtype=np.float64)
+            else:
+                start_T = max(st_ts.T[0], mt_ts.T[0])
+                end_T = min(st_ts.T[-1], mt_ts.T[-1])
+                if grid_step is None:
+                    # the median time between MT snapshots
+                    grid_step = float(np.median(np.diff(mt_ts.T))) if len(mt_ts) > 1 else 1.0
+                point_count = int((end_T - start_T)//grid_step) + 1 if end_T >= start_T else 0
+                grid_T = start_T + grid_step * np.arange(point_count, dtype=np.float64)
+            self.st_T = grid_T
+            self.mt_T = grid_T
+
+        # the time of each aligned point is the time of the MT snapshot
+        self.T = self.mt_T
+        self.grid_step = grid_step
+
+
+    def __len__(self):
+        return len(self.T)
+
+
+    def _align(self, ts, index_array, metric_name):
+        # aligned values of a metric in a time series
+        if self.mode == "grid":
+            return ts.at(self.T, metric_name, mode="linear")
+        return ts.get_series(metric_name)[index_array]
+
+
+    def get_st_series(self, metric_name):
+        return self._align(self._st_ts, self._st_index, metric_name)
+
+
+    def get_mt_series(self, metric_name):
+        return self._align(self._mt_ts, self._mt_index, metric_name)
+
+
+    def get_series(self, metric_name):
+        # arrays of the aligned values of a metric in ST and MT
+        return self.get_st_series(metric_name), self.get_mt_series(metric_name)
+
+
+    def get_df(self, metric_list):
+        """ Get a DataFrame with a row per aligned point with the time "T", the time of
+            the ST and MT snapshot ("st_T", "mt_T") and the value of each metric in
+            ST and MT ("st_*metric*", "mt_*metric*").
+        """
+        column_map = {"T": self.T, "st_T": self.st_T, "mt_T": self.mt_T}
+        for metric_name in metric_list:
+            column_map["st_{}".format(metric_name)], column_map["mt_{}".format(metric_name)] = self.get_series(metric_name)
+        return pd.DataFrame(column_map)
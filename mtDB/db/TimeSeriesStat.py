@@ -0,0 +1,154 @@
+import numpy as np
+
+
+""" This class stores the snapshots of stats collected at different
+    points in time during an experiment. The time of each snapshot is
+    stored in a sorted array T and the values of each metric are stored
+    in a separate array aligned with T. A value is NaN if the metric was
+    missing from a snapshot.
+
+    The class can also be used like the dict of snapshots that it replaces
+    where the key is the time and the value is a dict of metrics at that time.
+"""
+class TimeSeriesStat:
+    def __init__(self, time_array=None, metric_map=None):
+        if time_array is None:
+            time_array = np.empty(0, dtype=np.int64)
+        if metric_map is None:
+            metric_map = {}
+
+        # sort the snapshots by time, if there are multiple snapshots
+        # at the same time, the one that appears last is kept
+        time_array = np.asarray(time_array, dtype=np.int64)
+        reverse_time_array = time_array[::-1]
+        _, reverse_index = np.unique(reverse_time_array, return_index=True)
+        keep_index = len(time_array) - 1 - reverse_index
+
+        self.T = time_array[keep_index]
+        self._metric_map = {}
+        for metric_name in metric_map:
+            self._metric_map[metric_name] = np.asarray(metric_map[metric_name], dtype=np.float64)[keep_index]
+
+
+    @staticmethod
+    def from_snapshot_list(snapshot_list):
+        # create from a list of dict of metrics where each dict has the time "T" of the snapshot
+        metric_name_list = []
+        for snapshot in snapshot_list:
+            for metric_name in snapshot:
+                if metric_name != "T" and metric_name not in metric_name_list:
+                    metric_name_list.append(metric_name)
+
+        time_array = np.array([snapshot["T"] for snapshot in snapshot_list], dtype=np.int64)
+        metric_map = {}
+        for metric_name in metric_name_list:
+            metric_map[metric_name] = np.array([snapshot.get(metric_name, np.nan) for snapshot in snapshot_list],
+                                                dtype=np.float64)
+        return TimeSeriesStat(time_array, metric_map)
+
+
+    def get_metric_names(self):
+        return list(self._metric_map.keys())
+
+
+    def has_metric(self, metric_name):
+        return metric_name in self._metric_map
+
+
+    def get_series(self, metric_name):
+        # array of values of a metric aligned with self.T
+        if metric_name == "T":
+            return self.T
+        return self._metric_map[metric_name]
+
+
+    def get_index(self, T):
+        # index of the snapshot at time T
+        index = int(np.searchsorted(self.T, T))
+        if index == len(self.T) or self.T[index] != T:
+            raise KeyError(T)
+        return index
+
+
+    def get_nearest_index(self, T):
+        # index of the snapshot closest to each time in the array T (earlier snapshot on a tie)
+        query_array = np.asarray(T, dtype=np.float64)
+        if len(self.T) == 0:
+            return np.zeros(np.shape(query_array), dtype=np.int64)
+        right_index = np.minimum(np.searchsorted(self.T, query_array), len(self.T)-1)
+        left_index = np.maximum(right_index - 1, 0)
+        use_right = np.abs(self.T[right_index] - query_array) < np.abs(query_array - self.T[left_index])
+        return np.where(use_right, right_index, left_index)
+
+
+    def at(self, T, metric_name, mode="nearest"):
+        """ Get the value of a metric at time T where T can be a single value or an 
+            array of values. The time T does not need to match the time of a snapshot. 
+
+            The mode determines how the value is computed when T is not the time of a snapshot, 
+                - nearest: value of the snapshot closest to T (earlier snapshot on a tie)
+                - floor: value of the latest snapshot at or before T, NaN if T is before the first snapshot 
+                - linear: linear interpolation between the snapshots before and after T, NaN if T is 
+                    outside the time range of the snapshots 
+        """
+        query_array = np.atleast_1d(np.asarray(T, dtype=np.float64))
+        metric_array = self.get_series(metric_name).astype(np.float64)
+        if len(self.T) == 0:
+            value_array = np.full(len(query_array), np.nan)
+        elif mode == "nearest":
+            value_array = metric_array[self.get_nearest_index(query_array)]
+        elif mode == "floor":
+            index_array = np.searchsorted(self.T, query_array, side="right") - 1
+            value_array = np.where(index_array >= 0, metric_array[np.maximum(index_array, 0)], np.nan)
+        elif mode == "linear":
+            value_array = np.interp(query_array, self.T, metric_array, left=np.nan, right=np.nan)
+        else:
+            raise ValueError("Unknown mode {} for time series lookup".format(mode))
+
+        if np.ndim(T) == 0:
+            return value_array[0]
+        return value_array
+
+
+    def between(self, start_T, end_T, metric_name, mode="nearest"):
+        # change in the value of a metric from start_T to end_T, used for cumulative metrics like IO processed 
+        return self.at(end_T, metric_name, mode=mode) - self.at(start_T, metric_name, mode=mode)
+
+
+    def get_snapshot(self, index):
+        # dict of metrics of the snapshot at an index
+        snapshot = {"T": int(self.T[index])}
+        for metric_name, metric_array in self._metric_map.items():
+            metric_val = metric_array[index]
+            if not np.isnan(metric_val):
+                snapshot[metric_name] = int(metric_val)
+        return snapshot
+
+
+    def keys(self):
+        return [int(T) for T in self.T]
+
+
+    def values(self):
+        return [self.get_snapshot(index) for index in range(len(self.T))]
+
+
+    def items(self):
+        return [(int(self.T[index]), self.get_snapshot(index)) for index in range(len(self.T))]
+
+
+    def __getitem__(self, T):
+        return self.get_snapshot(self.get_index(T))
+
+
+    def __contains__(self, T):
+        index = np.searchsorted(self.T, T)
+        return index < len(self.T) and self.T[index] == T
+
+
+    def __iter__(self):
+        return iter(self.keys())
+
+
+    def __len__(self):
+        return len(self.T)
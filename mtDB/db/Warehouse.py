@@ -0,0 +1,158 @@
+import json
+import shutil
+import pathlib
+import numpy as np
+import pandas as pd
+
+from mtDB.db.DiffEngine import PARTITION_FEATURE_LIST
+from mtDB.db.RecordFile import get_temp_path
+from mtDB.db.OutputIndex import normalize_filters
+
+
+# version of the warehouse format, a warehouse of a different version is not loaded
+WAREHOUSE_VERSION = 1
+
+# file in the warehouse directory with the version, columns and partitions of the table
+COLUMNS_FILE_NAME = "columns.json"
+
+
+""" This class stores the combined table of MT/ST differences of MTDB
+    in a directory partitioned by machine and workload. Each column of a
+    partition is stored as a separate numpy array so that a subset of
+    partitions and columns can be loaded without reading the whole table.
+
+    The fingerprint of the output files the table was built from (see
+    MTDB.get_warehouse_fingerprint) is stored with the columns so that a
+    warehouse built before the output files changed is not used.
+"""
+class Warehouse:
+    def __init__(self, warehouse_dir):
+        self.warehouse_dir = pathlib.Path(warehouse_dir)
+
+        # the ordered list of columns, the list of partitions and the number of rows in each partition
+        self.column_list = []
+        self.partition_list = []
+        self.row_count_list = []
+        self.fingerprint = None 
+
+        if self.exists():
+            with self.warehouse_dir.joinpath(COLUMNS_FILE_NAME).open("r") as f:
+                columns_json = json.load(f)
+            self.column_list = columns_json["column_list"]
+            self.partition_list = [tuple(partition) for partition in columns_json["partition_list"]]
+            self.row_count_list = columns_json["row_count_list"]
+            self.fingerprint = columns_json.get("fingerprint")
+
+
+    def exists(self):
+        # check if there is a warehouse of the current version in the directory
+        columns_path = self.warehouse_dir.joinpath(COLUMNS_FILE_NAME)
+        if not columns_path.exists():
+            return False
+        with columns_path.open("r") as f:
+            return json.load(f).get("version") == WAREHOUSE_VERSION
+
+
+    def is_current(self, fingerprint):
+        # check if there is a warehouse built from output files with the fingerprint
+        return self.exists() and self.fingerprint == fingerprint
+
+
+    def _get_partition_dir(self, warehouse_dir, partition):
+        return warehouse_dir.joinpath(*[str(value) for value in partition])
+
+
+    def save(self, df, fingerprint=None):
+        """ Replace the table in the warehouse with a DataFrame and the fingerprint of the inputs
+            it was built from. The DataFrame must have the columns in PARTITION_FEATURE_LIST and
+            all other columns must be numeric.
+        """
+        for feature_name in PARTITION_FEATURE_LIST:
+            if feature_name not in df.columns:
+                raise ValueError("DataFrame does not have partition feature {}".format(feature_name))
+
+        # columns are stored in files named by their index as column names can contain "/"
+        column_list = list(df.columns)
+        partition_list, row_count_list = [], []
+
+        # the table is written to a temporary directory that replaces the warehouse once it is complete
+        temp_warehouse_dir = get_temp_path(self.warehouse_dir)
+        shutil.rmtree(temp_warehouse_dir, ignore_errors=True)
+        temp_warehouse_dir.mkdir(parents=True)
+        for partition, partition_df in df.groupby(PARTITION_FEATURE_LIST, sort=True):
+            partition_dir = self._get_partition_dir(temp_warehouse_dir, partition)
+            partition_dir.mkdir(parents=True)
+            for column_index, column_name in enumerate(column_list):
+                if column_name in PARTITION_FEATURE_LIST:
+                    continue
+                np.save(partition_dir.joinpath("{}.npy".format(column_index)),
+                            partition_df[column_name].to_numpy(dtype=np.float64))
+            partition_list.append(list(partition))
+            row_count_list.append(len(partition_df))
+
+        with temp_warehouse_dir.joinpath(COLUMNS_FILE_NAME).open("w") as f:
+            json.dump({
+                "version": WAREHOUSE_VERSION,
+                "column_list": column_list,
+                "partition_list": partition_list,
+                "row_count_list": row_count_list,
+                "fingerprint": fingerprint
+            }, f, indent=4)
+
+        shutil.rmtree(self.warehouse_dir, ignore_errors=True)
+        temp_warehouse_dir.rename(self.warehouse_dir)
+        self.column_list = column_list
+        self.partition_list = [tuple(partition) for partition in partition_list]
+        self.row_count_list = row_count_list
+        self.fingerprint = fingerprint
+
+
+    def get_partition_list(self, filters=None):
+        """ Get the partitions that match the filters. The filters is a dict where the key is
+            a feature in PARTITION_FEATURE_LIST and the value is a value or list of values of
+            the feature. For instance, {"machine_id": "c220g1", "workload_id": ["w82", "w97"]}
+        """
+        if filters is None:
+            return self.partition_list
+
+        partition_list = self.partition_list
+        for feature_name, value_list in normalize_filters(filters, PARTITION_FEATURE_LIST).items():
+            feature_index = PARTITION_FEATURE_LIST.index(feature_name)
+            partition_list = [partition for partition in partition_list if partition[feature_index] in value_list]
+        return partition_list
+
+
+    def load(self, filters=None, columns=None):
+        """ Load the rows of the partitions that match the filters with only the
+            columns specified. All columns are loaded if no columns are specified.
+        """
+        if not self.exists():
+            raise FileNotFoundError("No warehouse found in {}".format(self.warehouse_dir))
+
+        if columns is None:
+            columns = self.column_list
+        for column_name in columns:
+            if column_name not in self.column_list:
+                raise ValueError("Column {} not in warehouse {}".format(column_name, self.warehouse_dir))
+
+        df_list = []
+        for partition in self.get_partition_list(filters):
+            partition_dir = self._get_partition_dir(self.warehouse_dir, partition)
+            column_map = {}
+            for column_name in columns:
+                if column_name in PARTITION_FEATURE_LIST:
+                    continue
+                column_index = self.column_list.index(column_name)
+                column_map[column_name] = np.load(partition_dir.joinpath("{}.npy".format(column_index)))
+
+            row_count = self.row_count_list[self.partition_list.index(partition)]
+            for feature_index, feature_name in enumerate(PARTITION_FEATURE_LIST):
+                if feature_name in columns:
+                    column_map[feature_name] = [partition[feature_index]] * row_count
+
+            df_list.append(pd.DataFrame(column_map, columns=columns))
+
+        if len(df_list) == 0:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(df_list, ignore_index=True)
+
@@ -0,0 +1,107 @@
+import argparse
+import pathlib
+import time
+
+import numpy as np
+
+from mtDB.db.ExperimentOutput import ExperimentOutput
+
+DATA_DIR = pathlib.Path.home().joinpath("mtdata")
+
+
+""" This script compares the time to parse CacheBench output files
+    using the line by line loader that ExperimentOutput used before
+    and the current bulk loader of ExperimentOutput. The largest
+    output files (long experiments with many snapshots) are used.
+"""
+class ParseBenchmark:
+    def __init__(self, data_dir, file_count, repeat_count):
+        self.data_dir = pathlib.Path(data_dir)
+        self.repeat_count = repeat_count
+
+        # the largest output files in the data directory
+        output_path_list = [path for path in self.data_dir.rglob("*") if path.is_file()]
+        output_path_list = sorted(output_path_list, key=lambda path: path.stat().st_size, reverse=True)
+        self.output_path_list = output_path_list[:file_count]
+
+
+    def readline_load(self, output_path):
+        # the line by line loader, returns the summary stats and the time series as a dict of dicts
+        stat, ts_stat = {}, {}
+        with open(output_path) as f:
+            line = f.readline()
+            while line:
+                line = line.rstrip()
+                split_line = line.split("=")
+                if len(split_line) == 2 and '"' not in line:
+                    stat[split_line[0]] = float(split_line[1])
+                elif 'stat:' in line:
+                    temp_line = line.replace("stat:", "")
+                    metric_str_list = temp_line.split(",")
+                    stat_snapshot = {}
+                    for metric_str in metric_str_list:
+                        split_metric_str = metric_str.split("=")
+                        if len(split_metric_str) == 2:
+                            stat_snapshot[split_metric_str[0]] = int(float(split_metric_str[1]))
+                    ts_stat[int(stat_snapshot["T"])] = stat_snapshot
+                else:
+                    for config_name in ["nvmCacheSizeMB", "cacheSizeMB", "pageSizeBytes", "inputQueueSize",
+                                            "processorThreadCount", "scaleIAT"]:
+                        if config_name in line:
+                            stat[config_name] = int(line.split(":")[1].replace(",", ""))
+                    if "allocSizes" in line:
+                        stat["t1AllocSize"] = int(f.readline().rstrip())
+                line = f.readline()
+        return stat, ts_stat
+
+
+    def time_load(self, load_function):
+        # the minimum time in seconds from multiple runs
+        time_list = []
+        for _ in range(self.repeat_count):
+            start_time = time.perf_counter()
+            load_function()
+            time_list.append(time.perf_counter() - start_time)
+        return min(time_list)
+
+
+    def run(self):
+        print("{:40s} {:>8s} {:>10s} {:>10s} {:>10s} {:>8s}".format("file", "MB", "readline", "bulk", "lazy", "speedup"))
+        speedup_list = []
+        for output_path in self.output_path_list:
+            size_mb = output_path.stat().st_size/1e6
+            readline_time = self.time_load(lambda: self.readline_load(output_path))
+            bulk_time = self.time_load(lambda: ExperimentOutput(output_path))
+            lazy_time = self.time_load(lambda: ExperimentOutput(output_path, lazy=True))
+
+            # make sure that both loaders read the same data
+            stat, ts_stat = self.readline_load(output_path)
+            output = ExperimentOutput(output_path)
+            for metric_name in stat:
+                assert stat[metric_name] == output.stat[metric_name]
+            assert sorted(ts_stat.keys()) == output.ts_stat.keys()
+            for T in ts_stat:
+                assert ts_stat[T] == output.ts_stat[T]
+
+            speedup_list.append(readline_time/bulk_time)
+            print("{:40s} {:8.2f} {:8.1f}ms {:8.1f}ms {:8.1f}ms {:7.1f}x".format(
+                    "/".join(output_path.parts[-3:]),
+                    size_mb,
+                    readline_time*1e3,
+                    bulk_time*1e3,
+                    lazy_time*1e3,
+                    speedup_list[-1]))
+
+        if len(speedup_list) > 0:
+            print("Mean speedup of bulk loader: {:.1f}x".format(np.mean(speedup_list)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare parse time of experiment output files")
+    parser.add_argument("--d", default=DATA_DIR, type=pathlib.Path, help="Directory containing experiment outputs")
+    parser.add_argument("--n", default=10, type=int, help="Number of largest output files to parse")
+    parser.add_argument("--r", default=3, type=int, help="Number of times each file is parsed")
+    args = parser.parse_args()
+
+    benchmark = ParseBenchmark(args.d, args.n, args.r)
+    benchmark.run()
@@ -1,8 +1,6 @@
+import argparse
 import itertools
-from multiprocessing.sharedctypes import Value
 import pathlib 
-from tabulate import tabulate
-from scipy import stats
 import numpy as np 
 import pandas as pd 
 
@@ -10,9 +8,29 @@ import matplotlib.pyplot as plt
 plt.rcParams.update({'font.size': 25})
 
 DATA_DIR = pathlib.Path.home().joinpath("mtdata")
+CACHE_DIR = pathlib.Path.home().joinpath(".mtcache")
+WAREHOUSE_DIR = pathlib.Path.home().joinpath(".mtwarehouse")
 OUTPUT_DIR = pathlib.Path.home().joinpath("plots", "correlation")
 
 from mtDB.db.MTDB import MTDB
+from mtDB.db.Warehouse import Warehouse
+from mtDB.db.PlotPool import PlotPool
+from mtDB.db.PlotManifest import PlotManifest, get_input_fingerprint
+from mtDB.analysis.CorrelationEngine import CorrelationEngine
+from mtDB.analysis.CorrelationResampler import CorrelationResampler
+from mtDB.analysis.GroupingPlanner import GroupingPlanner
+from mtDB.analysis.SharedFramePool import SharedFramePool
+
+
+def get_group_corr(shared_frame, task):
+    # correlation of each pair of perf and pred metric of the rows of a group, run by the workers of a SharedFramePool 
+    row_index, perf_metric_list, pred_column_list, min_count, resample_count, seed = task 
+    perf_matrix = shared_frame.get_matrix(perf_metric_list, row_index)
+    pred_matrix = shared_frame.get_matrix(pred_column_list, row_index)
+    corr_map = CorrelationEngine(min_count=min_count).get_corr(perf_matrix, pred_matrix)
+    if resample_count > 0:
+        corr_map.update(CorrelationResampler(resample_count=resample_count, seed=seed).get_resampled_corr(perf_matrix, pred_matrix))
+    return corr_map 
 
 
 """ This script plots scatterplots and computes the 
@@ -25,9 +43,23 @@ from mtDB.db.MTDB import MTDB
     and write latency. 
 """
 class Correlation:
-    def __init__(self, df, eval=["best"]):
+    def __init__(self, df, eval=["best"], workers=1, resample_count=0, seed=0):
         self.df = df 
 
+        # in resampling mode (resample_count > 0), the table also has the bootstrap confidence interval 
+        # and permutation p-value of each pearson coefficient using a RNG seeded with seed, so groups 
+        # with few points are not left out of the table 
+        self.resample_count = resample_count 
+        self.seed = seed 
+
+        # the correlation of the groups is computed and the scatter plots are rendered by a pool of 
+        # worker processes, the plots are queued and rendered at the end of run() 
+        self.workers = workers 
+        self.plot_pool = PlotPool(workers, verbose=False)
+
+        # plot manifest of each output dir with the fingerprint of the data of each plot 
+        self.plot_manifest_map = {}
+
         # performance metrics 
         self.perf_metric_list = ["blockReadSlat_avg_ns", 
                                     "blockWriteSlat_avg_ns", 
@@ -42,7 +74,7 @@ class Correlation:
                                     "bandwidth_byte/s"]
         
         # different ways metrics are computed from multiple iterations
-        # currently the mean is taken so the bandwidth is the mean bandwidth across 3 iterations
+        # the rows of each eval type are selected using the "eval" column of the DataFrame 
         self.eval_list = eval
 
         # predictive metrics that we are evaluating to see if it has relationship with performance metrics 
@@ -95,9 +127,8 @@ class Correlation:
         self.output_dir = OUTPUT_DIR
         self.output_dir.mkdir(parents=True, exist_ok=True)
 
-        # table that stores the pearson correlation coeeficient and p-values for each pair of features compared
-        # under different groupings 
-        self.table = []
+        # table that stores the pearson and spearman correlation coeeficients and p-values for each pair 
+        # of features compared under different groupings 
         self.table_df = pd.DataFrame()
 
         # list of grouping features 
@@ -134,7 +165,7 @@ class Correlation:
         ]
 
 
-    def plot_df(self, df, perf_metric, eval_type, pred_metric, output_dir, instance_id, workload_id, config_id):
+    def plot_df(self, df, perf_metric, eval_type, pred_metric, output_dir):
         # generate a scatterplot from a pair of features specified by the user 
         xlabel = self.x_label_map[perf_metric]
         ylabel = self.y_label_map[pred_metric]
@@ -143,133 +174,192 @@ class Correlation:
         output_file_name = "{}_{}_{}.png".format(self.metric_name_map[perf_metric], eval_type, pred_metric)
         output_path = output_dir.joinpath(output_file_name)
 
-        # track when to map log of a metric just add "log_" before it 
-        if "log" in pred_metric:
-            pred_metric = "_".join(pred_metric.split("_")[1:])
-
         # get the x-axis (performance metric) and y-axis (predictive metric)
         perf_metric_list = df[perf_metric].to_numpy()
-        pred_metric_list = df[pred_metric].to_numpy()
+        pred_metric_list = df[self._get_pred_column(pred_metric)].to_numpy()
 
-        # filter infs and nans from the perf and pred metrics
+        # filter infs from the pred metrics
         inf_index = np.where(np.isinf(pred_metric_list))
         perf_metric_list = np.delete(perf_metric_list, inf_index)
         pred_metric_list = np.delete(pred_metric_list, inf_index)
 
-        # compute pearson correlation coeeficient and p-value and store in list 
-
-        if len(perf_metric_list) > 10:
-            res = stats.pearsonr(perf_metric_list, pred_metric_list)
-            table_entry = [
-                instance_id,
-                workload_id,
-                config_id,
-                perf_metric,
-                eval_type, 
-                pred_metric,
-                res.statistic,
-                res.pvalue
-            ]
-        else:
-            table_entry = [
-                instance_id,
-                workload_id,
-                config_id,
-                perf_metric,
-                eval_type, 
-                pred_metric,
-                0.0,
-                np.nan
-            ]
-        self.table.append(table_entry)
-
-        if not output_path.exists():
+        # the plot is made again if the data plotted changed since it was last plotted 
+        plot_manifest = self._get_plot_manifest(output_dir)
+        fingerprint = get_input_fingerprint(perf_metric_list, pred_metric_list, xlabel, ylabel)
+        if plot_manifest.is_stale(output_file_name, fingerprint) or not output_path.exists():
             # scatter plot of the predictive and performance metrics 
-            self.plot(perf_metric_list, 
-                        pred_metric_list, 
-                        output_dir.joinpath(output_file_name),
-                        xlabel,
-                        ylabel)
+            self.plot_pool.add_scatter(output_path, perf_metric_list, pred_metric_list, xlabel, ylabel, ylog='log' in ylabel)
+        plot_manifest.update(output_file_name, fingerprint, [output_file_name])
 
 
-    def run(self):
-        # only get rows with tier-2 cache (MT caches)
-        df = self.df[self.df["nvmCacheSizeMB"]>0]
+    def _get_pred_column(self, pred_metric):
+        # track when to map log of a metric just add "log_" before it 
+        if "log" in pred_metric:
+            return "_".join(pred_metric.split("_")[1:])
+        return pred_metric 
+
+
+    def _get_planner(self, df):
+        # grouping planner of the rows of the df for every grouping, the rows of each eval 
+        # type are grouped separately if the df has an "eval" column 
+        eval_feature_list = ["eval"] if "eval" in df.columns else []
+        return GroupingPlanner(df, [eval_feature_list + grouping_feature_map["feature_list"] \
+                                        for grouping_feature_map in self.grouping_features])
 
-        # iterate through each grouping features 
+
+    def _iter_groups(self, df, planner):
+        """ Yield the grouping features entry, the feature list planned, the name of the output dir of 
+            the group, its machine, workload and config id ("all" if not grouped by it), the eval type 
+            and the start and end of the slice of rows of the group in the rows ordered by 
+            planner.get_order(feature list) for each group and eval type of every grouping. 
+        """
+        eval_feature_list = ["eval"] if "eval" in df.columns else []
         for grouping_feature_map in self.grouping_features:
             grouping_feature_list = grouping_feature_map["feature_list"]
+            feature_list = eval_feature_list + grouping_feature_list
+            for label_tuple, label_str_tuple, numeric_tuple, start, end in planner.iter_groups(feature_list):
+                eval_type_list = self.eval_list 
+                if len(eval_feature_list) > 0:
+                    if label_tuple[0] not in self.eval_list:
+                        continue 
+                    eval_type_list = [label_tuple[0]]
+                    label_tuple, label_str_tuple, numeric_tuple = label_tuple[1:], label_str_tuple[1:], numeric_tuple[1:]
+
+                machine_id = "all"
+                if "machine_id" in grouping_feature_list:
+                    machine_id = label_tuple[grouping_feature_list.index("machine_id")]
+
+                workload_id = "all"
+                if "workload_id" in grouping_feature_list:
+                    workload_id = label_tuple[grouping_feature_list.index("workload_id")]
+
+                config_list = [label_str for label_str, numeric_flag in zip(label_str_tuple, numeric_tuple) if numeric_flag]
+                config_id = "all"
+                if len(config_list) > 0:
+                    config_id = "_".join(config_list)
+
+                output_dir_name = "_".join(label_str_tuple)
+                for eval_type in eval_type_list:
+                    yield grouping_feature_map, feature_list, output_dir_name, machine_id, workload_id, config_id, eval_type, start, end
+
+
+    def get_table_df(self):
+        """ Get a DataFrame with the Pearson and Spearman correlation coefficients and p-values of 
+            each pair of performance and predictive metric of each eval type in every group of 
+            every grouping. The coefficients of all pairs of a group and eval type are computed 
+            at once and pairs with 10 or fewer valid points are not in the table. In resampling 
+            mode, the bootstrap confidence interval and permutation p-value of the pearson 
+            coefficient are added and only pairs with 3 or fewer valid points are left out. 
+        """
+        # only get rows with tier-2 cache (MT caches)
+        df = self.df[self.df["nvmCacheSizeMB"]>0]
+        pred_column_list = [self._get_pred_column(pred_metric) for pred_metric in self.pred_metrics]
+        engine = CorrelationEngine(min_count=10)
+        if self.resample_count > 0:
+            engine = CorrelationEngine(min_count=CorrelationResampler().min_count)
+
+        # map of the key of each result of the engine and resampler to its column in the table 
+        column_name_map = {
+            "pearson": "pearson",
+            "pearson_p": "p-value",
+            "spearman": "spearman",
+            "spearman_p": "spearman_p-value",
+            "count": "count",
+            "pearson_ci_low": "pearson_ci_low",
+            "pearson_ci_high": "pearson_ci_high",
+            "permutation_p": "permutation_p-value"
+        }
+        key_list = ["pearson", "pearson_p", "spearman", "spearman_p", "count"]
+        if self.resample_count > 0:
+            key_list += ["pearson_ci_low", "pearson_ci_high", "permutation_p"]
+
+        # the rows of every group are a contiguous slice of the rows ordered for its feature list, the 
+        # metrics are placed in shared memory once and the groups are split across the worker processes 
+        planner = self._get_planner(df)
+        group_list, task_list = [], []
+        for _, feature_list, _, machine_id, workload_id, config_id, eval_type, start, end in self._iter_groups(df, planner):
+            group_list.append([machine_id, workload_id, config_id, eval_type])
+            task_list.append((planner.get_order(feature_list)[start:end], self.perf_metric_list, pred_column_list, 
+                                engine.min_count, self.resample_count, self.seed))
+
+        with SharedFramePool(df, workers=self.workers, column_list=self.perf_metric_list + pred_column_list) as frame_pool:
+            corr_map_list = frame_pool.map(get_group_corr, task_list)
+
+        row_list = []
+        for (machine_id, workload_id, config_id, eval_type), corr_map in zip(group_list, corr_map_list):
+            for perf_index, perf_metric in enumerate(self.perf_metric_list):
+                for pred_index, pred_column in enumerate(pred_column_list):
+                    row = [machine_id, workload_id, config_id, perf_metric, eval_type, pred_column]
+                    for key in key_list:
+                        row.append(corr_map[key][perf_index, pred_index])
+                    row_list.append(row)
+
+        table_df = pd.DataFrame(row_list, columns=["machine_id", "workload_id", "config_id", "perf", "eval", "pred"] + \
+                                                    [column_name_map[key] for key in key_list])
+        table_df["pearson_abs"] = abs(table_df["pearson"])
+        return table_df.dropna(subset=["pearson", "p-value"])
+
+
+    def _get_plot_manifest(self, output_dir):
+        # the plot manifest of an output dir, saved after the plots are rendered 
+        if output_dir not in self.plot_manifest_map:
+            self.plot_manifest_map[output_dir] = PlotManifest(output_dir)
+        return self.plot_manifest_map[output_dir]
 
-            # iterate through each group
-            for group_tuple, cur_df in df.groupby(grouping_feature_list):
-
-                # create a directory for each grouping 
-                output_dir = self.output_dir.joinpath(grouping_feature_map["output_dir_name"])
-                output_dir.mkdir(exist_ok=True)
-
-                if type(group_tuple) == str:
-                    group_tuple = tuple([group_tuple])
-
-                # create a dir for each grouping tuple 
-                output_dir_name_list = []
-                config_list = []
-                for param in group_tuple:
-                    try:
-                        str_param = str(int(param))
-                        config_list.append(str_param)
-                    except ValueError:
-                        str_param = str(param)
-                    output_dir_name_list.append(str_param)
-                output_dir_name = "_".join(output_dir_name_list)
-                output_dir = output_dir.joinpath(output_dir_name)
-                output_dir.mkdir(exist_ok=True)
-
-                # iterate through each combination of metrics to evaluate, plot and save 
-                for metric_combo in itertools.product(*[self.perf_metric_list, self.eval_list, self.pred_metrics]):
-                    perf_metric = metric_combo[0]
-                    eval_type = metric_combo[1]
-                    pred_metric = metric_combo[2]
-
-                    machine_id = "all"
-                    if "machine_id" in grouping_feature_list:
-                        index = grouping_feature_list.index("machine_id")
-                        machine_id = group_tuple[index]
-
-                    workload_id = "all"
-                    if "workload_id" in grouping_feature_list:
-                        index = grouping_feature_list.index("workload_id")
-                        workload_id = group_tuple[index]
-
-                    config_id = "all"
-                    if len(config_list) > 0:
-                        config_id = "_".join(config_list)
-
-                    self.plot_df(cur_df, perf_metric, eval_type, pred_metric, output_dir, machine_id, workload_id, config_id)
-
-        self.table_df = pd.DataFrame(self.table, columns=["machine_id", "workload_id", "config_id", "perf", "eval", "pred", "pearson", "p-value"])
-        self.table_df["pearson_abs"] = abs(self.table_df["pearson"])
-        self.table_df = self.table_df.dropna()
-        print(self.table_df.sort_values(by=["pearson_abs"], ascending=False))
 
+    def run(self):
+        # the table of correlation coefficients is computed before the plots 
+        self.table_df = self.get_table_df()
 
-    def plot(self, x_list, y_list, output_path, x_label, y_label, ylog=False):
-        _, ax = plt.subplots(figsize=[14, 10])
-        ax.scatter(x_list, y_list, s=80, alpha=0.6)
-        ax.set_xlabel(x_label)
-        ax.set_ylabel(y_label)
+        # only get rows with tier-2 cache (MT caches)
+        df = self.df[self.df["nvmCacheSizeMB"]>0]
 
-        if 'log' in y_label:
-            ax.set_yscale("log")
+        # iterate through each group and eval type of every grouping 
+        planner = self._get_planner(df)
+        for grouping_feature_map, feature_list, output_dir_name, _, _, _, eval_type, start, end in self._iter_groups(df, planner):
+            # create a directory for each grouping 
+            output_dir = self.output_dir.joinpath(grouping_feature_map["output_dir_name"])
+            output_dir.mkdir(exist_ok=True)
 
-        plt.tight_layout()
-        plt.savefig(output_path)
-        plt.close()
+            # create a dir for each grouping tuple 
+            output_dir = output_dir.joinpath(output_dir_name)
+            output_dir.mkdir(exist_ok=True)
 
+            # iterate through each combination of metrics to plot and save 
+            eval_df = df.iloc[planner.get_order(feature_list)[start:end]]
+            for perf_metric, pred_metric in itertools.product(*[self.perf_metric_list, self.pred_metrics]):
+                self.plot_df(eval_df, perf_metric, eval_type, pred_metric, output_dir)
+
+        self.plot_pool.run()
+        for plot_manifest in self.plot_manifest_map.values():
+            plot_manifest.save()
+
+        print(self.table_df.sort_values(by=["pearson_abs"], ascending=False))
 
-if __name__ == "__main__":
-    eval_type = "mean"
-    database = MTDB(DATA_DIR, eval=eval_type)
-    combined_df = database._get_combined_df()
 
-    analysis = Correlation(combined_df, eval=[eval_type])
-    analysis.run()
\ No newline at end of file
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compute correlation between predictive and performance metrics")
+    parser.add_argument("--rebuild", action="store_true", help="Build the warehouse again from experiment outputs")
+    parser.add_argument("--workers", type=int, default=1, help="Number of processes that compute correlations and render plots")
+    parser.add_argument("--resample", type=int, default=0, 
+                            help="Number of bootstrap and permutation resamples, no resampling if 0")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the random number generator used for resampling")
+    args = parser.parse_args()
+
+    # load the combined DataFrame of each eval type from the warehouse, build them from the experiment outputs 
+    # if needed or if the output files changed since they were built 
+    eval_list = ["mean", "best"]
+    database = MTDB(DATA_DIR, cache_dir=CACHE_DIR, stream=True)
+    warehouse_list = []
+    for eval_type in eval_list:
+        warehouse = Warehouse(WAREHOUSE_DIR.joinpath(eval_type))
+        if args.rebuild or not warehouse.is_current(database.get_warehouse_fingerprint(eval_type)):
+            if warehouse.exists() and not args.rebuild:
+                print("Output files changed since warehouse {} was built, building it again".format(warehouse.warehouse_dir))
+            warehouse = database.save_warehouse(WAREHOUSE_DIR.joinpath(eval_type), eval=eval_type)
+        warehouse_list.append(warehouse)
+    combined_df = pd.concat([warehouse.load().assign(eval=eval_type) for eval_type, warehouse in zip(eval_list, warehouse_list)],
+                                ignore_index=True)
+
+    analysis = Correlation(combined_df, eval=eval_list, workers=args.workers, resample_count=args.resample, seed=args.seed)
+    analysis.run()
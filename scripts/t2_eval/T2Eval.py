@@ -4,9 +4,10 @@ from mtDB.db.MTDB import MTDB
 OUTPUT_DIR = pathlib.Path.home().joinpath("plots", "t2_eval")
 OUTPUT_DIR.mkdir(exist_ok=True)
 DATA_DIR = pathlib.Path.home().joinpath("mtdata")
+CACHE_DIR = pathlib.Path.home().joinpath(".mtcache")
 
 if __name__ == "__main__":
-    database = MTDB(DATA_DIR, eval="best")
+    database = MTDB(DATA_DIR, eval="best", cache_dir=CACHE_DIR, stream=True)
     database.plot_overhead_vs_bandwidth(OUTPUT_DIR)
 
     print()
\ No newline at end of file
@@ -3,9 +3,10 @@ from mtDB.db.MTDB import MTDB
 
 OUTPUT_DIR = pathlib.Path.home().joinpath("plots", "time_series")
 DATA_DIR = pathlib.Path.home().joinpath("mtdata")
+CACHE_DIR = pathlib.Path.home().joinpath(".mtcache")
 
 if __name__ == "__main__":
-    database = MTDB(DATA_DIR, eval="best")
+    database = MTDB(DATA_DIR, eval="best", cache_dir=CACHE_DIR, stream=True)
     database.plot_ts(
                 ["overallBandwidth", 
                     "blockReadSLat_avg_ns", 
@@ -5,8 +5,11 @@ import pandas as pd
 pd.options.display.float_format = '{:,.2f}'.format
 
 from mtDB.db.MTDB import MTDB
+from mtDB.db.Warehouse import Warehouse
 
 DATA_DIR = pathlib.Path.home().joinpath("mtdata")
+CACHE_DIR = pathlib.Path.home().joinpath(".mtcache")
+WAREHOUSE_DIR = pathlib.Path.home().joinpath(".mtwarehouse")
 
 
 """ This class prints the top-n best, worst 
@@ -77,8 +80,20 @@ class TopN:
 
 
 if __name__ == "__main__":
-    database = MTDB(DATA_DIR, eval="best")
-    combined_df = database._get_combined_df()
+    parser = argparse.ArgumentParser(description="Print the best and worst MT cache configurations")
+    parser.add_argument("--rebuild", action="store_true", help="Build the warehouse again from experiment outputs")
+    args = parser.parse_args()
+
+    # load the combined DataFrame from the warehouse, build it from the experiment outputs if needed or if 
+    # the output files changed since it was built, the DBUnits are only loaded if the warehouse is built 
+    eval_type = "best"
+    database = MTDB(DATA_DIR, eval=eval_type, cache_dir=CACHE_DIR, stream=True)
+    warehouse = Warehouse(WAREHOUSE_DIR.joinpath(eval_type))
+    if args.rebuild or not warehouse.is_current(database.get_warehouse_fingerprint()):
+        if warehouse.exists() and not args.rebuild:
+            print("Output files changed since warehouse {} was built, building it again".format(warehouse.warehouse_dir))
+        warehouse = database.save_warehouse(WAREHOUSE_DIR.joinpath(eval_type))
+    combined_df = warehouse.load()
 
     top_n = TopN(combined_df)
     top_n.print_best_and_worst_bandwidth(2)
@@ -3,6 +3,6 @@ from setuptools import setup
 setup (
     name="mtDB",
     version="0.1",
-    packages=["mtDB.db", "mtDB.cydonia"],
-    install_requires=["numpy", "pandas", "pathlib"]
+    packages=["mtDB.db", "mtDB.cydonia", "mtDB.analysis"],
+    install_requires=["numpy", "pandas", "scipy", "pathlib"]
 )